@@ -0,0 +1,107 @@
+"""Admission control: token-bucket rate limits and concurrency caps.
+
+Buckets live in a small SQLite file so every gunicorn worker on the host
+draws from the same buckets; each check is one UPSERT ... RETURNING, which
+SQLite applies atomically. Like ``metrics``, this module has no Flask or
+application database imports.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    allowed INTEGER NOT NULL
+)
+"""
+
+# Refill for the time since the last take, capped at the burst size, then
+# take ``cost`` tokens if there are enough. Every expression in SET sees the
+# row as it was before the update.
+_TAKE = """
+INSERT INTO bucket (key, tokens, updated, allowed)
+VALUES (:key, :burst - :cost, :now, :burst >= :cost)
+ON CONFLICT (key) DO UPDATE SET
+    allowed = min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost,
+    tokens = min(:burst, tokens + max(0, :now - updated) * :rate)
+             - CASE WHEN min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost
+                    THEN :cost ELSE 0 END,
+    updated = :now
+RETURNING tokens, allowed
+"""
+
+
+class TokenBuckets:
+    """Token buckets shared by every process using the same ``path``."""
+
+    def __init__(self, path, busy_timeout_ms=200, prune_seconds=60):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.prune_seconds = prune_seconds
+        self._local = threading.local()
+        self._last_prune = time.time()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+            connection.execute('PRAGMA journal_mode = WAL')
+            # Losing the last few takes in a crash only resets some buckets
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, rate, burst, cost=1):
+        """Take ``cost`` tokens from bucket ``key``.
+
+        ``rate`` is in tokens per second and ``burst`` is the bucket size.
+        Returns 0 when the tokens were taken, otherwise the seconds until
+        there will be enough.
+        """
+        now = time.time()
+        connection = self._connection()
+        tokens, allowed = connection.execute(
+            _TAKE, {'key': key, 'rate': rate, 'burst': burst, 'cost': cost, 'now': now}
+        ).fetchone()
+        if now - self._last_prune > self.prune_seconds:
+            self._last_prune = now
+            self.prune(now)
+        if allowed:
+            return 0
+        return (cost - tokens) / rate if rate > 0 else float('inf')
+
+    def prune(self, now=None):
+        """Drop buckets idle long enough to have refilled completely."""
+        now = time.time() if now is None else now
+        # A bucket idle this long is full again for any rate we hand out
+        self._connection().execute('DELETE FROM bucket WHERE updated < ?', (now - 3600,))
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class ConcurrencyLimiter:
+    """Cap how many requests of one kind a process works on at once."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+    def acquire(self, timeout):
+        if self._semaphore is None:
+            return True
+        return self._semaphore.acquire(timeout=timeout)
+
+    def release(self):
+        if self._semaphore is not None:
+            self._semaphore.release()
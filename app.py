@@ -1,5 +1,6 @@
 from flask import (
     Flask, 
+    Request,
     render_template, 
     request, 
     redirect, 
@@ -9,24 +10,75 @@ from flask import (
     send_file, 
     make_response, 
     session,
-    Response
+    abort,
+    Response,
+    stream_with_context,
+    has_request_context,
+    g,
+    before_render_template,
+    template_rendered
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, SAWarning
+from sqlalchemy.orm import Session
 from flask_mail import Mail, Message
-from datetime import datetime
+from jinja2 import TemplateSyntaxError
+from markupsafe import Markup
+from jinja2.sandbox import SandboxedEnvironment
+from datetime import datetime, timedelta, timezone
 import os
-import qrcode
-from io import BytesIO, StringIO
+import atexit
+import smtplib
+import threading
+import time
+import click
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from io import BytesIO, StringIO, TextIOWrapper
 import csv
+import base64
+import hashlib
+import heapq
+import json
+import mimetypes
+import multiprocessing
+import re
+import sqlite3
+import tempfile
+import warnings
+import zipfile
+import zlib
+from contextlib import contextmanager
 from functools import wraps
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.utils import safe_join, secure_filename
 import secrets
 from dotenv import load_dotenv
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from PIL import Image
+from itsdangerous import URLSafeSerializer, BadSignature
+import admission
+import metrics
+import ticket_assets
 
 # Load environment variables
 load_dotenv()
 
+def env_bool(name, default=False):
+    """Read a true/false flag from the environment."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
 app = Flask(__name__)
 
 # Configure app with environment variables or defaults
@@ -45,32 +97,247 @@ else:
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # File upload configuration
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
+app.config['UPLOAD_FOLDER'] = os.environ.get(
+    'UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
+)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Ensure upload directory exists
+# Receipts are stored under their SHA-256 (see store_receipt)
+app.config['RECEIPT_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'receipts')
+app.config['RECEIPT_THUMBNAIL_SIZE'] = int(os.environ.get('RECEIPT_THUMBNAIL_SIZE', 400))
+
+# Receipt delivery: '' (Flask sends the file), 'x-accel' (nginx) or 'x-sendfile'
+app.config['RECEIPT_OFFLOAD'] = os.environ.get('RECEIPT_OFFLOAD', '').lower()
+app.config['RECEIPT_ACCEL_PREFIX'] = os.environ.get('RECEIPT_ACCEL_PREFIX', '/protected-uploads/')
+app.config['USE_X_SENDFILE'] = app.config['RECEIPT_OFFLOAD'] == 'x-sendfile'
+
+# Ensure upload directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'tmp'), exist_ok=True)
+os.makedirs(app.config['RECEIPT_FOLDER'], exist_ok=True)
+
+# Ticket QR cache configuration
+app.config['TICKET_CACHE_FOLDER'] = os.environ.get('TICKET_CACHE_FOLDER', os.path.join(app.instance_path, 'tickets'))
+app.config['TICKET_QR_MEMORY_ITEMS'] = int(os.environ.get('TICKET_QR_MEMORY_ITEMS', 512))
+os.makedirs(app.config['TICKET_CACHE_FOLDER'], exist_ok=True)
+
+# Printable PDF tickets: 'auto' uses wkhtmltopdf when installed and Pillow
+# otherwise, 'pillow' always draws them, anything else is a wkhtmltopdf path
+app.config['TICKET_PDF_RENDERER'] = os.environ.get('TICKET_PDF_RENDERER', 'auto')
+app.config['TICKET_PDF_WORKERS'] = int(os.environ.get('TICKET_PDF_WORKERS', os.cpu_count() or 2))
+
+# Fingerprinted static assets built by build_assets.py (see asset_url)
+app.config['ASSET_FOLDER'] = os.environ.get('ASSET_FOLDER', os.path.join(app.static_folder, 'dist'))
+app.config['ASSET_MAX_AGE'] = int(os.environ.get('ASSET_MAX_AGE', 365 * 24 * 3600))
+
+# Absolute address of the site, for links in emails (e.g. https://events.example.com)
+app.config['PUBLIC_BASE_URL'] = os.environ.get('PUBLIC_BASE_URL')
+
+# Public page caching configuration
+app.config['PROGRAM_CACHE_TTL'] = float(os.environ.get('PROGRAM_CACHE_TTL', 300))  # 0 keeps programs until invalidated
+app.config['PUBLIC_PAGE_MAX_AGE'] = int(os.environ.get('PUBLIC_PAGE_MAX_AGE', 300))
 
 # Email configuration
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = env_bool('MAIL_USE_TLS', True)
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER')
+app.config['MAIL_SUPPRESS_SEND'] = env_bool('MAIL_SUPPRESS_SEND', False)
+
+# Email outbox configuration (see EmailWorkerPool)
+app.config['MAIL_WORKERS'] = int(os.environ.get('MAIL_WORKERS', 2))
+app.config['MAIL_BATCH_SIZE'] = int(os.environ.get('MAIL_BATCH_SIZE', 20))
+app.config['MAIL_MAX_ATTEMPTS'] = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+app.config['MAIL_RETRY_BASE_SECONDS'] = int(os.environ.get('MAIL_RETRY_BASE_SECONDS', 30))
+app.config['MAIL_POLL_INTERVAL'] = float(os.environ.get('MAIL_POLL_INTERVAL', 5))
+app.config['MAIL_CONNECTION_IDLE_SECONDS'] = float(os.environ.get('MAIL_CONNECTION_IDLE_SECONDS', 30))
+app.config['MAIL_CLAIM_TIMEOUT_SECONDS'] = int(os.environ.get('MAIL_CLAIM_TIMEOUT_SECONDS', 300))
+
+# Broadcast configuration (see run_broadcast)
+app.config['BROADCAST_RATE_PER_MINUTE'] = float(os.environ.get('BROADCAST_RATE_PER_MINUTE', 60))  # 0 disables pacing
+app.config['BROADCAST_BATCH_SIZE'] = int(os.environ.get('BROADCAST_BATCH_SIZE', 50))
+app.config['BROADCAST_CLAIM_TIMEOUT_SECONDS'] = int(os.environ.get('BROADCAST_CLAIM_TIMEOUT_SECONDS', 300))
+
+# Metrics configuration (see /metrics)
+app.config['METRICS_FOLDER'] = os.environ.get('METRICS_FOLDER', os.path.join(app.instance_path, 'metrics'))
+app.config['METRICS_FLUSH_SECONDS'] = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+# Database engine tuning. SQLite runs in WAL mode so readers never block the
+# writer; Postgres pools are sized from the gunicorn thread count.
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+app.config['SQLITE_SINGLE_WRITER'] = env_bool('SQLITE_SINGLE_WRITER', False)
+app.config['GUNICORN_THREADS'] = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Admission control (see admission_limited). Rates are requests per minute
+# per client IP or username, which is also the burst allowed; 0 disables a
+# limit. Concurrency caps are per worker process.
+app.config['ADMISSION_CONTROL'] = env_bool('ADMISSION_CONTROL', True)
+app.config['RATE_LIMIT_DATABASE'] = os.environ.get('RATE_LIMIT_DATABASE', os.path.join(app.instance_path, 'ratelimit.db'))
+app.config['LOGIN_RATE_PER_IP'] = float(os.environ.get('LOGIN_RATE_PER_IP', 10))
+app.config['LOGIN_RATE_PER_USERNAME'] = float(os.environ.get('LOGIN_RATE_PER_USERNAME', 5))
+app.config['REGISTRATION_RATE_PER_IP'] = float(os.environ.get('REGISTRATION_RATE_PER_IP', 20))
+app.config['LOGIN_CONCURRENCY'] = int(os.environ.get('LOGIN_CONCURRENCY', 1))
+app.config['REGISTRATION_CONCURRENCY'] = int(os.environ.get(
+    'REGISTRATION_CONCURRENCY', max(1, app.config['GUNICORN_THREADS'] - 1)))
+app.config['ADMISSION_QUEUE_SECONDS'] = float(os.environ.get('ADMISSION_QUEUE_SECONDS', 0.5))
+# Number of reverse proxies in front of the app whose X-Forwarded-For to trust
+app.config['PROXY_FIX_HOPS'] = int(os.environ.get('PROXY_FIX_HOPS', 0))
+if app.config['PROXY_FIX_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_HOPS'],
+                            x_proto=app.config['PROXY_FIX_HOPS'])
+
+class WriterLockedConnection(sqlite3.Connection):
+    """sqlite3 connection that releases the single-writer lock when its
+    transaction ends (see SQLiteWriterLock)."""
+    writer_lock = None
+
+    def _release_writer(self):
+        if self.writer_lock is not None:
+            lock, self.writer_lock = self.writer_lock, None
+            lock.release()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._release_writer()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._release_writer()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release_writer()
+
+class SQLiteWriterLock:
+    """Lets one write transaction at a time into an SQLite database.
+
+    Writers queue on a thread lock and, across gunicorn workers, on an
+    exclusive lock file, instead of polling SQLite's busy handler. A burst
+    of writes is then handed off in turn without backing off or hitting
+    "database is locked". Reentrant within a thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1 and fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+_sqlite_writer_locks = {}
+_sqlite_writer_locks_lock = threading.Lock()
+SQLITE_WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+def sqlite_writer_lock(database):
+    with _sqlite_writer_locks_lock:
+        lock = _sqlite_writer_locks.get(database)
+        if lock is None:
+            lock = _sqlite_writer_locks[database] = SQLiteWriterLock(f"{database}.writer.lock")
+        return lock
+
+def engine_options():
+    """SQLAlchemy engine options for the configured database."""
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        if app.config['SQLITE_SINGLE_WRITER']:
+            return {'connect_args': {'factory': WriterLockedConnection}}
+        return {}
+    # Each gunicorn worker has its own pool: one connection per request
+    # thread plus one per email worker, with headroom for bursts
+    pool_size = app.config['GUNICORN_THREADS'] + app.config['MAIL_WORKERS']
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', app.config['GUNICORN_THREADS'])),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+    }
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 
 # Initialize extensions
 db = SQLAlchemy(app)
 mail = Mail(app)
 
+@db.event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+    cursor.execute(f"PRAGMA journal_mode = {app.config['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous = {app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.close()
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def _acquire_sqlite_writer(conn, cursor, statement, parameters, context, executemany):
+    dbapi_connection = conn.connection.dbapi_connection
+    if not isinstance(dbapi_connection, WriterLockedConnection) or dbapi_connection.writer_lock is not None:
+        return
+    database = conn.engine.url.database
+    if database and database != ':memory:' and statement.lstrip()[:7].upper().startswith(SQLITE_WRITE_STATEMENTS):
+        lock = sqlite_writer_lock(database)
+        lock.acquire()
+        dbapi_connection.writer_lock = lock
+
 class Program(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     location = db.Column(db.String(100))
     fee = db.Column(db.Float)
+    capacity = db.Column(db.Integer)  # None means unlimited
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     registrations = db.relationship('Registration', backref='program', lazy=True)
 
+class ChangeSequence(db.Model):
+    """Counters handing out change sequence numbers (see next_change_seq)."""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+def next_change_seq(connection, name='registration'):
+    """Take the next change sequence number inside the current transaction.
+
+    The counter row stays locked until the transaction ends, so numbers
+    become visible in commit order and a reader that has seen number N
+    will never later find a smaller one committed.
+    """
+    table = ChangeSequence.__table__
+    return connection.execute(
+        table.update().where(table.c.name == name)
+        .values(value=table.c.value + 1)
+        .returning(table.c.value)
+    ).scalar_one()
+
+def _registration_change_seq(context):
+    # Column default/onupdate: runs for ORM flushes and Core statements alike;
+    # a set-based UPDATE takes one number for all the rows it touches
+    return next_change_seq(context.connection)
+
 class Registration(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     program_id = db.Column(db.Integer, db.ForeignKey('program.id'), nullable=False)
@@ -83,8 +350,135 @@ class Registration(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='pending')
     payment_reference = db.Column(db.String(100))
+    payment_receipt = db.Column(db.String(200))  # original filename of the upload
+    receipt_sha256 = db.Column(db.String(64), index=True)
+    receipt_size = db.Column(db.Integer)
+    receipt_mime = db.Column(db.String(100))
+    notes = db.Column(db.Text)
+    idempotency_key = db.Column(db.String(64))  # client token from the registration form
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default='0',
+                           default=_registration_change_seq, onupdate=_registration_change_seq)
+
+    __table_args__ = (
+        # Indexes backing the admin listing's keyset pagination and filters
+        db.Index('ix_registration_created_at_id', 'created_at', 'id'),
+        db.Index('ix_registration_program_created_at', 'program_id', 'created_at', 'id'),
+        db.Index('ix_registration_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_registration_email', 'email'),
+        db.Index('ix_registration_program_status_created_at', 'program_id', 'status', 'created_at'),
+        db.Index('ux_registration_idempotency_key', 'idempotency_key', unique=True),
+        # Change feed (see registration_changes)
+        db.Index('ix_registration_change_seq', 'change_seq', 'id'),
+        db.Index('ix_registration_updated_at', 'updated_at'),
+        # Archived and deleted ids are never handed out again
+        {'sqlite_autoincrement': True},
+    )
+
+class RegistrationTombstone(db.Model):
+    """Marks a deleted registration for change feed consumers."""
+    id = db.Column(db.Integer, primary_key=True)
+    registration_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    reason = db.Column(db.String(20), nullable=False, default='deleted')
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_registration_tombstone_change_seq', 'change_seq', 'id'),
+    )
+
+class RegistrationArchive(db.Model):
+    """Registrations moved out of the hot table (see archive_registrations).
+
+    Same columns as Registration, keeping the original ids, plus when the
+    row was archived.
+    """
+    __tablename__ = 'registration_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    program_id = db.Column(db.Integer, db.ForeignKey('program.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(20))
+    organization = db.Column(db.String(200))
+    designation = db.Column(db.String(100))
+    expectations = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20))
+    payment_reference = db.Column(db.String(100))
     payment_receipt = db.Column(db.String(200))
+    receipt_sha256 = db.Column(db.String(64))
+    receipt_size = db.Column(db.Integer)
+    receipt_mime = db.Column(db.String(100))
     notes = db.Column(db.Text)
+    idempotency_key = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_registration_archive_program_created_at', 'program_id', 'created_at', 'id'),
+        db.Index('ix_registration_archive_created_at', 'created_at', 'id'),
+        db.Index('ix_registration_archive_email', 'email'),
+    )
+
+class EmailOutbox(db.Model):
+    """Emails waiting to be sent by the background workers.
+
+    Rows are written in the same transaction as the registration they belong
+    to, so an email is queued if and only if the registration was saved.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    registration_id = db.Column(db.Integer, db.ForeignKey('registration.id'), index=True)
+    kind = db.Column(db.String(30), nullable=False)  # 'confirmation' or 'ticket'
+    recipient = db.Column(db.String(120), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), index=True)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    registration = db.relationship('Registration', backref=db.backref('emails', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+class Broadcast(db.Model):
+    """An email to every matching registrant of a program.
+
+    Recipients are sent to in registration id order and
+    ``last_registration_id`` is committed after each one, so an interrupted
+    run resumes with the next recipient instead of starting over.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    program_id = db.Column(db.Integer, db.ForeignKey('program.id'), nullable=False, index=True)
+    subject = db.Column(db.String(200), nullable=False)  # Jinja template source
+    body = db.Column(db.Text, nullable=False)  # Jinja template source (HTML)
+    recipient_status = db.Column(db.String(20))  # None means everyone holding a seat
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, interrupted, completed, cancelled
+    last_registration_id = db.Column(db.Integer, nullable=False, default=0)
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    claim_token = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    program = db.relationship('Program', backref='broadcasts')
+
+class RegistrationStat(db.Model):
+    """Pre-aggregated registration counts per program, status and day.
+
+    Kept up to date as registrations change (see apply_stat_deltas), so the
+    dashboard reads a handful of rows instead of scanning registrations.
+    """
+    program_id = db.Column(db.Integer, db.ForeignKey('program.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -97,52 +491,280 @@ class Admin(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-def init_db():
-    """Initialize the database and create default data."""
-    try:
-        with app.app_context():
-            # Drop and recreate all tables to apply schema changes
-            db.drop_all()
-            db.create_all()
-            
-            # Create default programs
-            programs = [
-                Program(
-                    name='London Masterclass',
-                    description='Advanced training program in London',
-                    location='London',
-                    fee=3550000.00  # ₦3,550,000
-                ),
-                Program(
-                    name='Lagos Masterclass',
-                    description='Advanced training program in Lagos',
-                    location='Lagos',
-                    fee=1250000.00  # ₦1,250,000
-                )
-            ]
-            for program in programs:
-                try:
-                    db.session.add(program)
-                    db.session.commit()
-                    print(f"Added program: {program.name}")
-                except Exception as e:
-                    print(f"Error adding program {program.name}: {str(e)}")
-                    db.session.rollback()
-            
-            # Create default admin
+class SchemaMigration(db.Model):
+    """Schema versions that have been applied to this database."""
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def create_index_if_missing(connection, table_name, name, columns, unique=False):
+    """Create index ``name`` on ``columns`` unless ``table_name`` already has it.
+
+    Migrations spell out their indexes rather than taking them from the
+    models, which also index columns that only later migrations add.
+    """
+    # Only names are needed, and reflecting an expression index such as
+    # lower(email) would warn on every start
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', SAWarning)
+        existing = {i['name'] for i in db.inspect(connection).get_indexes(table_name)}
+    if name not in existing:
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        connection.execute(db.text(f"CREATE {kind} {name} ON {table_name} ({', '.join(columns)})"))
+
+def add_column_if_missing(connection, table_name, column):
+    """Add ``column`` (a ``db.Column`` with a name) to an existing table."""
+    existing = {c['name'] for c in db.inspect(connection).get_columns(table_name)}
+    if column.name not in existing:
+        column_type = column.type.compile(dialect=connection.dialect)
+        ddl = f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}'
+        if column.server_default is not None:
+            ddl += f' DEFAULT {column.server_default.arg}'
+        connection.execute(db.text(ddl))
+
+def _migrate_create_tables(connection):
+    db.metadata.create_all(bind=connection)
+
+def _migrate_registration_indexes(connection):
+    # create_all() skips tables that already exist, including their indexes
+    create_index_if_missing(connection, 'registration', 'ix_registration_created_at_id', ['created_at', 'id'])
+    create_index_if_missing(connection, 'registration', 'ix_registration_program_created_at',
+                            ['program_id', 'created_at', 'id'])
+    create_index_if_missing(connection, 'registration', 'ix_registration_status_created_at',
+                            ['status', 'created_at', 'id'])
+    create_index_if_missing(connection, 'registration', 'ix_registration_email', ['email'])
+
+def _migrate_receipt_metadata(connection):
+    for name in ('receipt_sha256', 'receipt_size', 'receipt_mime'):
+        add_column_if_missing(connection, 'registration', Registration.__table__.c[name])
+    create_index_if_missing(connection, 'registration', 'ix_registration_receipt_sha256', ['receipt_sha256'])
+
+def _migrate_program_capacity(connection):
+    for name in ('capacity', 'seats_taken'):
+        add_column_if_missing(connection, 'program', Program.__table__.c[name])
+    create_index_if_missing(connection, 'registration', 'ix_registration_program_status_created_at',
+                            ['program_id', 'status', 'created_at'])
+    recount_seats(connection, archived=False)
+
+def _migrate_registration_stats(connection):
+    RegistrationStat.__table__.create(connection, checkfirst=True)
+    rebuild_stats(connection, archived=False)
+
+def _migrate_search_index(connection):
+    create_search_index(connection)
+
+def _migrate_idempotency(connection):
+    add_column_if_missing(connection, 'registration', Registration.__table__.c['idempotency_key'])
+    create_index_if_missing(connection, 'registration', 'ux_registration_idempotency_key',
+                            ['idempotency_key'], unique=True)
+    # Left pending, and retried on the next start, while duplicates block the index
+    return create_email_unique_index(connection)
+
+def _migrate_broadcasts(connection):
+    Broadcast.__table__.create(connection, checkfirst=True)
+
+def _migrate_change_feed(connection):
+    for name in ('updated_at', 'change_seq'):
+        add_column_if_missing(connection, 'registration', Registration.__table__.c[name])
+    create_index_if_missing(connection, 'registration', 'ix_registration_change_seq', ['change_seq', 'id'])
+    create_index_if_missing(connection, 'registration', 'ix_registration_updated_at', ['updated_at'])
+    ChangeSequence.__table__.create(connection, checkfirst=True)
+    RegistrationTombstone.__table__.create(connection, checkfirst=True)
+    exists = connection.execute(
+        db.select(ChangeSequence.name).where(ChangeSequence.name == 'registration')
+    ).first()
+    if exists is None:
+        connection.execute(db.insert(ChangeSequence).values(name='registration', value=0))
+    # Existing rows share one change number, so the feed sends them (once)
+    # like any other change
+    table = Registration.__table__
+    pending = connection.execute(db.select(table.c.id).where(table.c.change_seq == 0).limit(1)).first()
+    if pending is not None:
+        connection.execute(
+            table.update().where(table.c.change_seq == 0)
+            .values(change_seq=next_change_seq(connection), updated_at=table.c.updated_at)
+        )
+
+def _migrate_archive(connection):
+    RegistrationArchive.__table__.create(connection, checkfirst=True)
+
+def _migrate_registration_autoincrement(connection):
+    # SQLite hands out max(id) + 1, so once the newest rows are archived or
+    # deleted their ids would go to new registrations. Postgres sequences
+    # never go back. SQLite cannot alter a primary key, so the table is rebuilt.
+    if connection.dialect.name != 'sqlite':
+        return
+    table_sql = connection.execute(db.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'registration'"
+    )).scalar()
+    if 'AUTOINCREMENT' in table_sql.upper():
+        return
+    dependents = connection.execute(db.text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'registration' "
+        "AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )).scalars().all()
+    # Reflecting also loads the tables the foreign keys point at
+    metadata = db.MetaData()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', SAWarning)
+        old = db.Table('registration', metadata, autoload_with=connection)
+    new = db.Table(
+        'registration_rebuild', metadata,
+        *[db.Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable,
+                    server_default=column.server_default.arg if column.server_default is not None else None)
+          for column in old.columns],
+        *[db.ForeignKeyConstraint(fk.column_keys, [element.target_fullname for element in fk.elements])
+          for fk in old.foreign_key_constraints],
+        sqlite_autoincrement=True
+    )
+    new.create(connection)
+    columns = ', '.join(column.name for column in old.columns)
+    connection.execute(db.text(f"INSERT INTO registration_rebuild ({columns}) SELECT {columns} FROM registration"))
+    connection.execute(db.text("DROP TABLE registration"))
+    connection.execute(db.text("ALTER TABLE registration_rebuild RENAME TO registration"))
+    for statement in dependents:
+        connection.execute(db.text(statement))
+    # Start above every id ever handed out, including archived and deleted rows
+    highest = max(connection.execute(db.text(
+        "SELECT coalesce(max(id), 0) FROM registration UNION ALL "
+        "SELECT coalesce(max(id), 0) FROM registration_archive UNION ALL "
+        "SELECT coalesce(max(registration_id), 0) FROM registration_tombstone UNION ALL "
+        "SELECT coalesce(max(registration_id), 0) FROM email_outbox"
+    )).scalars())
+    connection.execute(db.text("DELETE FROM sqlite_sequence WHERE name = 'registration'"))
+    connection.execute(db.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('registration', :seq)"),
+                       {'seq': highest})
+
+# Ordered schema migrations: (version, description, function(connection)).
+# Every migration must be idempotent, because migration 1 creates tables from
+# the current models and later migrations may find their work already done.
+MIGRATIONS = [
+    (1, 'Create tables', _migrate_create_tables),
+    (2, 'Registration listing indexes', _migrate_registration_indexes),
+    (3, 'Receipt content hash, size and type', _migrate_receipt_metadata),
+    (4, 'Program capacity and seat counter', _migrate_program_capacity),
+    (5, 'Registration statistics', _migrate_registration_stats),
+    (6, 'Full-text search index', _migrate_search_index),
+    (7, 'Registration idempotency keys and unique email per program', _migrate_idempotency),
+    (8, 'Broadcast emails', _migrate_broadcasts),
+    (9, 'Registration change feed', _migrate_change_feed),
+    (10, 'Registration archive', _migrate_archive),
+    (11, 'Never reuse registration ids', _migrate_registration_autoincrement),
+]
+
+def run_migrations():
+    """Apply pending migrations, each in its own transaction."""
+    with db.engine.begin() as connection:
+        SchemaMigration.__table__.create(connection, checkfirst=True)
+        applied = set(connection.execute(db.select(SchemaMigration.version)).scalars())
+
+    count = 0
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with db.engine.begin() as connection:
+            # A migration returns False when it could not finish yet; it is
+            # left unrecorded so the next start tries again
+            finished = migrate(connection) is not False
+            if finished:
+                connection.execute(db.insert(SchemaMigration).values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+        if not finished:
+            print(f"Migration {version} ({description}) is incomplete and will be retried on the next start")
+            continue
+        print(f"Applied migration {version}: {description}")
+        count += 1
+    return count
+
+def seed_defaults():
+    """Create the default programs and admin account if they are missing."""
+    added = []
+    if not db.session.query(Program.query.exists()).scalar():
+        db.session.add_all([
+            Program(
+                name='London Masterclass',
+                description='Advanced training program in London',
+                location='London',
+                fee=3550000.00  # ₦3,550,000
+            ),
+            Program(
+                name='Lagos Masterclass',
+                description='Advanced training program in Lagos',
+                location='Lagos',
+                fee=1250000.00  # ₦1,250,000
+            )
+        ])
+        added.append('programs')
+
+    if not db.session.query(Admin.query.exists()).scalar():
+        admin = Admin(username='admin')
+        admin.set_password(os.environ.get('ADMIN_PASSWORD', 'admin123'))
+        db.session.add(admin)
+        added.append('admin user')
+
+    if added:
+        db.session.commit()
+        print(f"Added default {' and '.join(added)}")
+
+@contextmanager
+def startup_lock():
+    """Serialise startup work across processes.
+
+    Uses a Postgres advisory lock when running on Postgres (workers may live
+    on different hosts) and a lock file in the instance folder otherwise.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as connection:
+            connection.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': STARTUP_LOCK_KEY})
             try:
-                admin = Admin(username='admin')
-                admin.set_password('admin123')
-                db.session.add(admin)
-                db.session.commit()
-                print("Added admin user")
-            except Exception as e:
-                print(f"Error adding admin: {str(e)}")
-                db.session.rollback()
-                
-    except Exception as e:
-        print(f"Error initializing database: {str(e)}")
-        db.session.rollback()
+                yield
+            finally:
+                connection.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': STARTUP_LOCK_KEY})
+                connection.commit()
+        return
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'startup.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+STARTUP_LOCK_KEY = 7321004
+
+def init_db():
+    """Bring the schema up to date and seed default data.
+
+    Safe to run from every process and on every boot: it never drops data,
+    runs under a cross-process lock, and skips work that is already done.
+    """
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            with startup_lock():
+                locked = time.perf_counter()
+                applied = run_migrations()
+                migrated = time.perf_counter()
+                seed_defaults()
+            finished = time.perf_counter()
+            print(f"Database ready in {(finished - started) * 1000:.1f} ms "
+                  f"(lock wait {(locked - started) * 1000:.1f} ms, "
+                  f"{applied} migrations in {(migrated - locked) * 1000:.1f} ms, "
+                  f"seed {(finished - migrated) * 1000:.1f} ms)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error initializing database: {str(e)}")
+            # Refuse to start on a half-migrated schema
+            raise
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Apply schema migrations and seed default data."""
+    init_db()
 
 def admin_required(f):
     @wraps(f)
@@ -153,196 +775,1313 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def send_confirmation_email(registration, program):
+class LRUCache:
+    """A small thread-safe least-recently-used cache."""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+qr_memory_cache = LRUCache(app.config['TICKET_QR_MEMORY_ITEMS'])
+
+def ticket_qr_payload(registration_id, name, program_name):
+    return f"Registration ID: {registration_id}\nName: {name}\nProgram: {program_name}"
+
+def get_ticket_qr(registration):
+    """Return ``(cache_key, png_bytes)`` for a registration's ticket QR.
+
+    Lookups go memory LRU -> content-addressed disk cache -> render, so each
+    distinct QR is rendered at most once per cache folder.
+    """
+    payload = ticket_qr_payload(registration.id, registration.name, registration.program.name)
+    key = ticket_assets.qr_cache_key(payload)
+    png = qr_memory_cache.get(key)
+    if png is None:
+        path = ticket_assets.qr_cache_path(app.config['TICKET_CACHE_FOLDER'], key)
+        with app_metrics.timer('file_io_seconds', operation='qr_cache_read'):
+            png = ticket_assets.read_cache_file(path)
+        if png is None:
+            with app_metrics.timer('qr_render_seconds'):
+                png = ticket_assets.render_qr_png(payload)
+            with app_metrics.timer('file_io_seconds', operation='qr_cache_write'):
+                ticket_assets.write_cache_file(path, png)
+        qr_memory_cache.put(key, png)
+    return key, png
+
+def _ticket_serializer():
+    return URLSafeSerializer(app.config['SECRET_KEY'], salt='ticket-qr')
+
+def ticket_token_payload(registration):
+    # The creation time pins the token to this registrant, not just to an id
+    return [registration.id, registration.created_at.isoformat() if registration.created_at else None]
+
+def ticket_token(registration):
+    """Token that lets a registrant fetch their own ticket QR."""
+    return _ticket_serializer().dumps(ticket_token_payload(registration))
+
+def ticket_qr_url(registration):
+    """Link a registrant can open to see their ticket QR without logging in.
+
+    Inside a request the link is relative to the site being visited. Emails
+    are built by background workers, so they need PUBLIC_BASE_URL; without
+    it this returns None.
+    """
+    values = {'registration_id': registration.id, 'token': ticket_token(registration)}
+    if has_request_context():
+        return url_for('ticket_qr', **values)
+    if not app.config['PUBLIC_BASE_URL']:
+        return None
+    return app.config['PUBLIC_BASE_URL'].rstrip('/') + app.url_map.bind('').build('ticket_qr', values)
+
+def registration_success_message(registration, text):
+    """Flash-ready success message with a link to the registrant's ticket QR."""
+    return Markup('{} <a href="{}" class="alert-link">View your ticket QR code</a>.').format(
+        text, ticket_qr_url(registration))
+
+# Receipt types we accept, keyed by MIME type: (magic prefix, extension)
+RECEIPT_TYPES = {
+    'application/pdf': (b'%PDF', 'pdf'),
+    'image/png': (b'\x89PNG\r\n\x1a\n', 'png'),
+    'image/jpeg': (b'\xff\xd8\xff', 'jpg'),
+}
+RECEIPT_CHUNK_SIZE = 64 * 1024
+
+class ReceiptRejected(ValueError):
+    pass
+
+class HashingTempFile:
+    """Upload spool file that hashes the bytes as they are written.
+
+    Werkzeug writes each uploaded file into one of these while parsing the
+    request, so the SHA-256, size and leading bytes are known as soon as the
+    upload is complete, without reading it back. The file lives in the upload
+    folder, so storing it is a rename; unclaimed files are removed on close.
+    """
+
+    def __init__(self, directory):
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        if len(self.head) < 16:
+            self.head += bytes(data[:16 - len(self.head)])
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def move_to(self, path):
+        """Move the spooled upload to ``path``; it is no longer ours to delete."""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = None
+
+    def close(self):
+        self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingTempFile(os.path.join(app.config['UPLOAD_FOLDER'], 'tmp'))
+
+app.request_class = UploadRequest
+
+def receipt_storage_path(sha256, mime):
+    extension = RECEIPT_TYPES[mime][1]
+    return os.path.join(app.config['RECEIPT_FOLDER'], sha256[:2], f"{sha256}.{extension}")
+
+def receipt_path(registration):
+    """Filesystem path of a registration's receipt."""
+    if registration.receipt_sha256:
+        return receipt_storage_path(registration.receipt_sha256, registration.receipt_mime)
+    # Receipts uploaded before content addressing were saved under their name
+    return os.path.join(app.config['UPLOAD_FOLDER'], registration.payment_receipt)
+
+def store_receipt(file):
+    """Store an uploaded receipt under its SHA-256 and return its metadata.
+
+    Identical files are stored once. The type is taken from the file's
+    leading bytes rather than the client-supplied name or content type.
+    Returns a dict of Registration column values.
+    """
+    stream = file.stream
+    if not isinstance(stream, HashingTempFile):
+        # Uploads that did not come through UploadRequest: copy in chunks
+        stream = HashingTempFile(os.path.join(app.config['UPLOAD_FOLDER'], 'tmp'))
+        for chunk in iter(lambda: file.stream.read(RECEIPT_CHUNK_SIZE), b''):
+            stream.write(chunk)
+
     try:
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(f"Registration ID: {registration.id}\nName: {registration.name}\nProgram: {program.name}")
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Save QR code to bytes
-        img_bytes = BytesIO()
-        qr_img.save(img_bytes, format='PNG')
-        img_bytes.seek(0)
-        
-        # Create email
-        msg = Message(
-            'Registration Confirmation',
-            recipients=[registration.email]
+        mime = next((m for m, (magic, _) in RECEIPT_TYPES.items() if stream.head.startswith(magic)), None)
+        if mime is None:
+            raise ReceiptRejected('Payment receipts must be PDF, PNG or JPEG files.')
+
+        sha256 = stream.sha256.hexdigest()
+        path = receipt_storage_path(sha256, mime)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with app_metrics.timer('file_io_seconds', operation='receipt_store'):
+                stream.move_to(path)
+            if mime.startswith('image/'):
+                receipt_executor().submit(make_receipt_thumbnail, path, sha256)
+
+        return {
+            'payment_receipt': secure_filename(file.filename) or os.path.basename(path),
+            'receipt_sha256': sha256,
+            'receipt_size': stream.size,
+            'receipt_mime': mime,
+        }
+    finally:
+        stream.close()
+
+def receipt_thumbnail_path(sha256):
+    return os.path.join(app.config['RECEIPT_FOLDER'], 'thumbs', sha256[:2], f"{sha256}.jpg")
+
+def make_receipt_thumbnail(path, sha256):
+    """Write a small JPEG preview of an image receipt (runs off the request path)."""
+    try:
+        thumbnail = receipt_thumbnail_path(sha256)
+        if os.path.exists(thumbnail):
+            return
+        size = app.config['RECEIPT_THUMBNAIL_SIZE']
+        with app_metrics.timer('file_io_seconds', operation='receipt_thumbnail'), Image.open(path) as image:
+            image.thumbnail((size, size))
+            buffer = BytesIO()
+            image.convert('RGB').save(buffer, format='JPEG', quality=80, optimize=True)
+        ticket_assets.write_cache_file(thumbnail, buffer.getvalue())
+    except Exception as e:
+        print(f"Error creating receipt thumbnail: {str(e)}")
+
+_receipt_executor = None
+_receipt_executor_pid = None
+_receipt_executor_lock = threading.Lock()
+
+def receipt_executor():
+    """Background thread pool for receipt post-processing, created per process."""
+    global _receipt_executor, _receipt_executor_pid
+    with _receipt_executor_lock:
+        if _receipt_executor_pid != os.getpid():
+            _receipt_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='receipts')
+            _receipt_executor_pid = os.getpid()
+        return _receipt_executor
+
+def build_email_message(entry):
+    """Build the Flask-Mail message for an outbox entry."""
+    registration = entry.registration
+    if registration is None:
+        raise ValueError('Registration no longer exists')
+    program = registration.program
+
+    msg = Message(
+        'Registration Confirmation',
+        recipients=[entry.recipient]
+    )
+
+    _, qr_png = get_ticket_qr(registration)
+    if entry.kind == 'ticket':
+        msg.html = render_template(
+            'ticket_email.html',
+            name=registration.name,
+            registration=registration,
+            registration_id=registration.id,
+            qr_code='cid:registration_qr',
+            qr_url=ticket_qr_url(registration)
         )
-        
-        # Render email template
+        msg.attach(
+            'registration_qr.png',
+            'image/png',
+            qr_png,
+            disposition='inline',
+            headers=[('Content-ID', '<registration_qr>')]
+        )
+    else:
         msg.html = render_template(
             'email/confirmation.html',
             name=registration.name,
+            program=program,
             program_name=program.name,
             registration_id=registration.id,
             event_date=registration.created_at.strftime('%Y-%m-%d'),
-            payment_reference=registration.payment_reference
+            payment_reference=registration.payment_reference,
+            waitlisted=registration.status == 'waitlisted',
+            qr_url=ticket_qr_url(registration)
         )
-        
-        # Attach QR code
         msg.attach(
             'registration_qr.png',
             'image/png',
-            img_bytes.getvalue()
+            qr_png
         )
-        
-        # Send email
-        mail.send(msg)
-        print(f"Confirmation email sent to {registration.email}")
-        return True
-    except Exception as e:
-        print(f"Error sending confirmation email: {str(e)}")
-        return False
+    return msg
 
-@app.route('/')
-def welcome():
+def queue_email(registration, kind='confirmation'):
+    """Add an outbox entry for ``registration`` to the current session.
+
+    The caller commits; the entry becomes visible to the workers together
+    with the registration itself.
+    """
+    entry = EmailOutbox(registration=registration, kind=kind, recipient=registration.email)
+    db.session.add(entry)
+    return entry
+
+def _outbox_due_filter(now):
+    stale_claim = now - timedelta(seconds=app.config['MAIL_CLAIM_TIMEOUT_SECONDS'])
+    return db.or_(
+        db.and_(EmailOutbox.status == 'queued', EmailOutbox.next_attempt_at <= now),
+        db.and_(EmailOutbox.status == 'sending', EmailOutbox.claimed_at < stale_claim)
+    )
+
+def claim_outbox_batch(limit):
+    """Atomically claim up to ``limit`` due outbox entries for this worker."""
+    now = datetime.utcnow()
+    token = secrets.token_hex(16)
+    ids = [row.id for row in db.session.query(EmailOutbox.id)
+           .filter(_outbox_due_filter(now))
+           .order_by(EmailOutbox.next_attempt_at)
+           .limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return []
+
+    # Re-check the due condition in the UPDATE so two workers racing for the
+    # same rows cannot both claim them.
+    EmailOutbox.query\
+        .filter(EmailOutbox.id.in_(ids), _outbox_due_filter(now))\
+        .update({'status': 'sending', 'claim_token': token, 'claimed_at': now},
+                synchronize_session=False)
+    db.session.commit()
+    return EmailOutbox.query.filter_by(claim_token=token).order_by(EmailOutbox.id).all()
+
+def _record_email_failure(entry, error):
+    entry.attempts += 1
+    entry.last_error = str(error)
+    entry.claim_token = None
+    if entry.attempts >= app.config['MAIL_MAX_ATTEMPTS']:
+        entry.status = 'failed'
+    else:
+        delay = min(app.config['MAIL_RETRY_BASE_SECONDS'] * 2 ** (entry.attempts - 1), 3600)
+        entry.status = 'queued'
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+def open_smtp_connection():
+    with app_metrics.timer('smtp_connect_seconds'):
+        connection = mail.connect()
+        connection.__enter__()
+    return connection
+
+def close_smtp_connection(connection):
     try:
-        return render_template('welcome.html')
-    except Exception as e:
-        print(f"Error in welcome route: {str(e)}")
-        return "An error occurred", 500
+        connection.__exit__(None, None, None)
+    except Exception:
+        pass
 
-@app.route('/register')
-def register():
+def deliver_outbox_batch(entries, connection=None):
+    """Send ``entries`` over one SMTP connection and record the outcome.
+
+    Returns the connection so the caller can reuse it for the next batch, or
+    ``None`` if it was lost and has to be reopened.
+    """
+    for entry in entries:
+        try:
+            msg = build_email_message(entry)
+            if connection is None:
+                connection = open_smtp_connection()
+            with app_metrics.timer('smtp_send_seconds'):
+                connection.send(msg)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+            print(f"SMTP connection error sending email {entry.id}: {str(e)}")
+            app_metrics.inc('smtp_send_failures_total')
+            _record_email_failure(entry, e)
+            if connection is not None:
+                close_smtp_connection(connection)
+            connection = None
+        except Exception as e:
+            print(f"Error sending email {entry.id}: {str(e)}")
+            app_metrics.inc('smtp_send_failures_total')
+            _record_email_failure(entry, e)
+        else:
+            entry.attempts += 1
+            entry.status = 'sent'
+            entry.sent_at = datetime.utcnow()
+            entry.claim_token = None
+            entry.last_error = None
+    db.session.commit()
+    return connection
+
+class EmailWorkerPool:
+    """Background threads that drain the email outbox.
+
+    Each thread claims a batch of due entries, sends them over an SMTP
+    connection it keeps open while there is work, and closes the connection
+    after ``MAIL_CONNECTION_IDLE_SECONDS`` without mail. Threads are started
+    lazily in the process that serves requests, so they survive gunicorn's
+    fork.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._pid = None
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = []
+            for i in range(self.app.config['MAIL_WORKERS']):
+                thread = threading.Thread(target=self._run, name=f'email-outbox-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Wake the workers up after new entries were committed."""
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _run(self):
+        connection = None
+        last_sent = 0.0
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                try:
+                    entries = claim_outbox_batch(self.app.config['MAIL_BATCH_SIZE'])
+                    if entries:
+                        connection = deliver_outbox_batch(entries, connection)
+                        last_sent = time.monotonic()
+                        continue
+                except Exception as e:
+                    print(f"Error in email worker: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+                idle = time.monotonic() - last_sent
+                if connection is not None and idle >= self.app.config['MAIL_CONNECTION_IDLE_SECONDS']:
+                    close_smtp_connection(connection)
+                    connection = None
+                self._wakeup.wait(self.app.config['MAIL_POLL_INTERVAL'])
+                self._wakeup.clear()
+            if connection is not None:
+                close_smtp_connection(connection)
+
+email_workers = EmailWorkerPool(app)
+
+@app.before_request
+def start_background_workers():
+    email_workers.ensure_started()
+
+# Instrumentation. Every process records into its own registry and writes a
+# snapshot to METRICS_FOLDER at most every METRICS_FLUSH_SECONDS; /metrics
+# merges the snapshots of all gunicorn workers.
+app_metrics = metrics.Registry()
+app_metrics.histogram('http_request_duration_seconds', 'Time spent handling requests, by endpoint.')
+app_metrics.histogram('http_request_db_queries', 'SQL statements executed per request.',
+                      buckets=metrics.COUNT_BUCKETS)
+app_metrics.histogram('http_request_db_seconds', 'Time spent in SQL statements per request.')
+app_metrics.histogram('db_query_duration_seconds', 'Duration of individual SQL statements.')
+app_metrics.histogram('template_render_seconds', 'Time spent rendering templates.')
+app_metrics.histogram('qr_render_seconds', 'Time spent rendering ticket QR codes.')
+app_metrics.histogram('smtp_connect_seconds', 'Time spent opening SMTP connections.')
+app_metrics.histogram('smtp_send_seconds', 'Time spent sending one email over SMTP.')
+app_metrics.counter('smtp_send_failures_total', 'Emails whose SMTP send failed.')
+app_metrics.histogram('file_io_seconds', 'Time spent on upload and cache file I/O, by operation.')
+app_metrics.counter('admission_rejections_total', 'Requests turned away by admission control, by limit.')
+
+_metrics_local = threading.local()
+_metrics_flush = {'at': 0.0, 'lock': threading.Lock()}
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def _metrics_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@db.event.listens_for(Engine, 'after_cursor_execute')
+def _metrics_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    app_metrics.observe('db_query_duration_seconds', elapsed)
+    if getattr(_metrics_local, 'active', False):
+        _metrics_local.queries += 1
+        _metrics_local.query_seconds += elapsed
+
+@before_render_template.connect_via(app)
+def _metrics_template_started(sender, template, context, **extra):
+    _metrics_local.__dict__.setdefault('templates', []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def _metrics_template_rendered(sender, template, context, **extra):
+    started = getattr(_metrics_local, 'templates', None)
+    if started:
+        app_metrics.observe('template_render_seconds', time.perf_counter() - started.pop(),
+                            template=template.name or 'string')
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    _metrics_local.active = True
+    _metrics_local.queries = 0
+    _metrics_local.query_seconds = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        # Unmatched URLs share one label so random paths cannot blow up cardinality
+        endpoint = request.endpoint or 'unmatched'
+        app_metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                            endpoint=endpoint, method=request.method, status=str(response.status_code))
+        app_metrics.observe('http_request_db_queries', _metrics_local.queries, endpoint=endpoint)
+        app_metrics.observe('http_request_db_seconds', _metrics_local.query_seconds, endpoint=endpoint)
+        _metrics_local.active = False
+        flush_metrics()
+    return response
+
+def flush_metrics(force=False):
+    """Write this process' snapshot if the last one is older than METRICS_FLUSH_SECONDS."""
+    now = time.monotonic()
+    if not force and now - _metrics_flush['at'] < app.config['METRICS_FLUSH_SECONDS']:
+        return
+    if not _metrics_flush['lock'].acquire(blocking=force):
+        return  # another thread is already writing it
     try:
-        programs = Program.query.all()
-        return render_template('index.html', programs=programs)
+        _metrics_flush['at'] = now
+        app_metrics.write_snapshot(app.config['METRICS_FOLDER'])
     except Exception as e:
-        print(f"Error in register route: {str(e)}")
-        flash('Error loading programs. Please try again later.', 'error')
-        return redirect(url_for('welcome'))
+        print(f"Error writing metrics snapshot: {str(e)}")
+    finally:
+        _metrics_flush['lock'].release()
 
-@app.route('/register/<int:program_id>', methods=['GET', 'POST'])
-def program_registration(program_id):
-    try:
-        program = Program.query.get_or_404(program_id)
-        if request.method == 'POST':
-            # Get form data
-            name = request.form.get('name')
-            email = request.form.get('email')
-            phone = request.form.get('phone')
-            organization = request.form.get('organization')
-            designation = request.form.get('designation')
-            expectations = request.form.get('expectations')
-            payment_reference = request.form.get('payment_reference')
-            
-            # Handle file upload
-            payment_receipt = None
-            if 'payment_receipt' in request.files:
-                file = request.files['payment_receipt']
-                if file and file.filename:
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    payment_receipt = filename
+def clear_metrics_snapshots():
+    """Remove snapshots left by earlier processes (called when gunicorn starts)."""
+    folder = app.config['METRICS_FOLDER']
+    if os.path.isdir(folder):
+        for filename in os.listdir(folder):
+            os.remove(os.path.join(folder, filename))
 
-            # Create registration
-            registration = Registration(
-                program_id=program_id,
-                name=name,
-                email=email,
-                phone=phone,
-                organization=organization,
-                designation=designation,
-                expectations=expectations,
-                payment_reference=payment_reference,
-                payment_receipt=payment_receipt
-            )
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics for every worker process.
 
-            # Save to database
-            db.session.add(registration)
-            db.session.commit()
+    Readable by a logged-in admin or with ``Authorization: Bearer
+    <METRICS_TOKEN>``.
+    """
+    token = app.config['METRICS_TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    authorized = session.get('admin_logged_in') or (
+        token and authorization.startswith('Bearer ')
+        and secrets.compare_digest(authorization[len('Bearer '):], token)
+    )
+    if not authorized:
+        return jsonify({'error': 'Not authorized'}), 403
+    try:
+        flush_metrics(force=True)
+        definitions, merged = metrics.merge_snapshots(metrics.read_snapshots(app.config['METRICS_FOLDER']))
+        response = Response(metrics.render_prometheus(definitions, merged),
+                            mimetype='text/plain; version=0.0.4')
+        response.cache_control.no_store = True
+        return response
+    except Exception as e:
+        print(f"Error rendering metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-            # Send confirmation email
-            email_sent = send_confirmation_email(registration, program)
-            if not email_sent:
-                flash('Registration successful but there was an issue sending the confirmation email. Please contact support.', 'warning')
-            else:
-                flash('Registration successful! Please check your email for confirmation.', 'success')
+# Admission control. Token buckets are shared by all workers through
+# RATE_LIMIT_DATABASE and checked before any other work, so a flood of
+# logins or registrations is answered with a cheap 429 instead of password
+# hashing, database writes and emails. The concurrency caps keep request
+# threads free for everyone else while the costly ones run.
+rate_limits = admission.TokenBuckets(app.config['RATE_LIMIT_DATABASE'])
+concurrency_limits = {
+    'login': admission.ConcurrencyLimiter(app.config['LOGIN_CONCURRENCY']),
+    'registration': admission.ConcurrencyLimiter(app.config['REGISTRATION_CONCURRENCY']),
+}
 
-            return redirect(url_for('welcome'))
+def admission_keys(kind):
+    """The ``(bucket key, requests per minute)`` pairs a POST of ``kind`` draws from."""
+    ip = request.remote_addr or 'unknown'
+    if kind == 'login':
+        username = (request.form.get('username') or '').strip().lower()[:150]
+        return [(f"login:ip:{ip}", app.config['LOGIN_RATE_PER_IP']),
+                (f"login:user:{username}", app.config['LOGIN_RATE_PER_USERNAME'])]
+    return [(f"{kind}:ip:{ip}", app.config['REGISTRATION_RATE_PER_IP'])]
 
-        return render_template('registration_form.html', program=program)
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in registration: {str(e)}")
-        flash('An error occurred during registration. Please try again.', 'error')
-        return redirect(url_for('register'))
+def rejection(status, retry_after, limit):
+    app_metrics.inc('admission_rejections_total', limit=limit)
+    retry_after = max(1, int(retry_after + 0.999))
+    response = Response(f"Too many requests. Please try again in {retry_after} seconds.\n",
+                        status=status, mimetype='text/plain')
+    response.headers['Retry-After'] = str(retry_after)
+    return response
 
-@app.route('/submit_registration', methods=['POST'])
-def submit_registration():
+def admission_limited(kind):
+    """Apply the ``kind`` rate limits and concurrency cap to POSTs of a view."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'POST' or not app.config['ADMISSION_CONTROL']:
+                return f(*args, **kwargs)
+            for key, per_minute in admission_keys(kind):
+                if per_minute <= 0:
+                    continue
+                try:
+                    retry_after = rate_limits.take(key, per_minute / 60.0, per_minute)
+                except sqlite3.Error as e:
+                    # Fail open: a broken limiter must not lock everyone out
+                    print(f"Error checking rate limit: {str(e)}")
+                    continue
+                if retry_after:
+                    return rejection(429, retry_after, ':'.join(key.split(':', 2)[:2]))
+            limiter = concurrency_limits[kind]
+            if not limiter.acquire(timeout=app.config['ADMISSION_QUEUE_SECONDS']):
+                return rejection(503, 1, f"{kind}:concurrency")
+            try:
+                return f(*args, **kwargs)
+            finally:
+                limiter.release()
+        return decorated_function
+    return decorator
+
+@app.cli.command('drain-outbox')
+def drain_outbox_command():
+    """Send every due email in the outbox, then exit."""
+    connection = None
     try:
-        program_id = request.form.get('program_id')
-        name = request.form.get('name')
-        email = request.form.get('email')
-        phone = request.form.get('phone')
-        organization = request.form.get('organization')
-        designation = request.form.get('designation')
-        expectations = request.form.get('expectations')
-        payment_reference = request.form.get('payment_reference')
-        
-        # Handle file upload
-        payment_receipt = None
-        if 'payment_receipt' in request.files:
-            file = request.files['payment_receipt']
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                payment_receipt = filename
-
-        registration = Registration(
-            program_id=program_id,
-            name=name,
-            email=email,
-            phone=phone,
-            organization=organization,
-            designation=designation,
-            expectations=expectations,
-            payment_reference=payment_reference,
-            payment_receipt=payment_receipt
-        )
-        
-        db.session.add(registration)
-        db.session.commit()
+        while True:
+            entries = claim_outbox_batch(app.config['MAIL_BATCH_SIZE'])
+            if not entries:
+                break
+            connection = deliver_outbox_batch(entries, connection)
+    finally:
+        if connection is not None:
+            close_smtp_connection(connection)
 
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(f"Registration ID: {registration.id}\nName: {name}\nEmail: {email}")
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Save QR code
-        qr_buffer = BytesIO()
-        qr_img.save(qr_buffer, format='PNG')
-        qr_buffer.seek(0)
-        
-        # Send confirmation email with QR code
-        msg = Message(
-            'Registration Confirmation',
-            recipients=[email]
+    counts = db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id))\
+        .group_by(EmailOutbox.status).all()
+    for status, count in counts:
+        click.echo(f"{status}: {count}")
+
+# Registrations in these statuses do not hold a seat in their program
+SEAT_FREE_STATUSES = ('waitlisted', 'cancelled', 'rejected')
+
+def holds_seat(status):
+    return (status or 'pending') not in SEAT_FREE_STATUSES
+
+def seat_holding_clause(model=Registration):
+    return db.func.coalesce(model.status, 'pending').notin_(SEAT_FREE_STATUSES)
+
+# Seat bookkeeping runs on the session's connection rather than through the
+# ORM, so counter updates do not invalidate the program cache.
+
+def reserve_seat(program_id):
+    """Take one seat if the program has room; returns False when it is full.
+
+    A single conditional UPDATE: Postgres row-locks the program and
+    re-checks the condition for concurrent writers, and SQLite serialises
+    writers, so the counter never goes past capacity.
+    """
+    result = db.session.connection().execute(
+        db.update(Program)
+        .where(Program.id == program_id,
+               db.or_(Program.capacity.is_(None), Program.seats_taken < Program.capacity))
+        .values(seats_taken=Program.seats_taken + 1)
+    )
+    return result.rowcount == 1
+
+def reserve_seats(program_id, count):
+    """Take up to ``count`` seats at once and return how many were granted."""
+    connection = db.session.connection()
+    # Touch the row first so we hold its write lock while reading the counter
+    connection.execute(db.update(Program).where(Program.id == program_id)
+                       .values(seats_taken=Program.seats_taken))
+    capacity, taken = connection.execute(
+        db.select(Program.capacity, Program.seats_taken).where(Program.id == program_id)
+    ).one()
+    granted = count if capacity is None else max(0, min(count, capacity - taken))
+    if granted:
+        connection.execute(db.update(Program).where(Program.id == program_id)
+                           .values(seats_taken=Program.seats_taken + granted))
+    return granted
+
+def adjust_seats(program_id, delta):
+    """Apply a seat count change, then promote from the waitlist into any free seats."""
+    db.session.flush()
+    connection = db.session.connection()
+    if delta:
+        connection.execute(
+            db.update(Program).where(Program.id == program_id)
+            .values(seats_taken=db.case((Program.seats_taken + delta < 0, 0),
+                                        else_=Program.seats_taken + delta))
         )
-        msg.html = render_template(
-            'ticket_email.html',
-            name=name,
-            registration_id=registration.id
+    return fill_from_waitlist(program_id)
+
+def fill_from_waitlist(program_id):
+    """Promote the oldest waitlisted registrations into free seats.
+
+    Promoted registrations become 'pending' and get a confirmation email.
+    Returns their ids.
+    """
+    # Pending ORM changes must reach the database before expire_all() below
+    db.session.flush()
+    connection = db.session.connection()
+    capacity, taken = connection.execute(
+        db.select(Program.capacity, Program.seats_taken)
+        .where(Program.id == program_id).with_for_update()
+    ).one()
+    free = None if capacity is None else capacity - taken
+    if free is not None and free <= 0:
+        return []
+
+    query = db.select(Registration.id, Registration.email, Registration.created_at)\
+        .where(Registration.program_id == program_id, Registration.status == 'waitlisted')\
+        .order_by(Registration.created_at, Registration.id)\
+        .with_for_update()
+    if free is not None:
+        query = query.limit(free)
+    promoted = connection.execute(query).all()
+    if not promoted:
+        return []
+
+    ids = [reg_id for reg_id, _, _ in promoted]
+    connection.execute(db.update(Registration).where(Registration.id.in_(ids)).values(status='pending'))
+    deltas = Counter()
+    for _, _, created_at in promoted:
+        deltas[stat_key(program_id, 'waitlisted', created_at)] -= 1
+        deltas[stat_key(program_id, 'pending', created_at)] += 1
+    apply_stat_deltas(connection, deltas)
+    connection.execute(db.update(Program).where(Program.id == program_id)
+                       .values(seats_taken=Program.seats_taken + len(ids)))
+    connection.execute(db.insert(EmailOutbox), [
+        {'registration_id': reg_id, 'kind': 'confirmation', 'recipient': email}
+        for reg_id, email, _ in promoted
+    ])
+    # Identity map copies of the promoted rows are stale now
+    db.session.expire_all()
+    return ids
+
+def seat_deltas(clauses, holds_after):
+    """Per-program seat change if every registration matching ``clauses``
+    moves to a status that holds a seat (``holds_after``) or not.
+    Must run before the rows are changed."""
+    rows = db.session.execute(
+        db.select(Registration.program_id,
+                  db.func.count(Registration.id),
+                  db.func.sum(db.case((seat_holding_clause(), 1), else_=0)))
+        .where(*clauses)
+        .group_by(Registration.program_id)
+    ).all()
+    deltas = {}
+    for program_id, total, holding in rows:
+        holding = holding or 0
+        delta = (total - holding) if holds_after else -holding
+        if delta:
+            deltas[program_id] = delta
+    return deltas
+
+def recount_seats(connection=None, archived=True):
+    """Recompute every program's seat counter from its registrations,
+    archived ones included unless ``archived`` is false (migrations that run
+    before the archive table exists)."""
+    connection = connection or db.session.connection()
+    holding = [
+        db.select(db.func.count(model.id))
+        .where(model.program_id == Program.id, seat_holding_clause(model))
+        .scalar_subquery()
+        for model in ((Registration, RegistrationArchive) if archived else (Registration,))
+    ]
+    connection.execute(db.update(Program).values(seats_taken=sum(holding[1:], holding[0])))
+
+# Statuses whose fees count as collected on the dashboard
+CONFIRMED_STATUSES = ('approved', 'confirmed')
+
+def stat_key(program_id, status, created_at):
+    created_at = created_at or datetime.utcnow()
+    return (program_id, status or 'pending', created_at.date())
+
+def apply_stat_deltas(connection, deltas):
+    """Add ``deltas`` ({(program_id, status, day): change}) to the stats table.
+
+    One upsert per distinct key, executed as a single executemany.
+    """
+    rows = [
+        {'program_id': program_id, 'status': status, 'day': day, 'count': change}
+        for (program_id, status, day), change in deltas.items() if change
+    ]
+    if not rows:
+        return
+    table = RegistrationStat.__table__
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert(table) if dialect == 'sqlite' else postgresql.insert(table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=['program_id', 'status', 'day'],
+            set_={'count': table.c['count'] + insert.excluded['count']}
+        ), rows)
+        return
+    for row in rows:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.program_id == row['program_id'], table.c.status == row['status'],
+                   table.c.day == row['day'])
+            .values(count=table.c['count'] + row['count'])
         )
-        msg.attach(
-            'registration_qr.png',
-            'image/png',
-            qr_buffer.getvalue()
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+def stat_deltas_for(clauses, new_status=None):
+    """Stat changes for moving every registration matching ``clauses`` to
+    ``new_status`` (or deleting them when it is None). Run before the change."""
+    rows = db.session.execute(
+        db.select(Registration.program_id, Registration.status, Registration.created_at)
+        .where(*clauses)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+    deltas = Counter()
+    for program_id, status, created_at in rows:
+        key = stat_key(program_id, status, created_at)
+        deltas[key] -= 1
+        if new_status is not None:
+            deltas[(key[0], new_status, key[2])] += 1
+    return deltas
+
+def stat_day_expression(dialect_name, created_at=Registration.created_at):
+    if dialect_name == 'sqlite':
+        return db.func.date(created_at)
+    return db.cast(created_at, db.Date)
+
+def rebuild_stats(connection=None, archived=True):
+    """Recompute the stats table from scratch with one aggregate query.
+
+    Archived registrations are counted too, so archiving leaves the stats as
+    they were; migrations that run before the archive table exists pass
+    ``archived=False``.
+    """
+    connection = connection or db.session.connection()
+    rows = db.union_all(*[
+        db.select(model.program_id.label('program_id'),
+                  db.func.coalesce(model.status, 'pending').label('status'),
+                  stat_day_expression(connection.dialect.name, model.created_at).label('day'))
+        .where(model.created_at.isnot(None))
+        for model in ((Registration, RegistrationArchive) if archived else (Registration,))
+    ]).subquery()
+    connection.execute(RegistrationStat.__table__.delete())
+    connection.execute(
+        RegistrationStat.__table__.insert().from_select(
+            ['program_id', 'status', 'day', 'count'],
+            db.select(rows.c.program_id, rows.c.status, rows.c.day, db.func.count())
+            .group_by(rows.c.program_id, rows.c.status, rows.c.day)
         )
-        mail.send(msg)
+    )
+
+@db.event.listens_for(Registration, 'after_insert')
+def _stats_after_insert(mapper, connection, target):
+    apply_stat_deltas(connection, {stat_key(target.program_id, target.status, target.created_at): 1})
+
+@db.event.listens_for(Registration, 'after_update')
+def _stats_after_update(mapper, connection, target):
+    state = db.inspect(target)
+    changed = {}
+    for name in ('program_id', 'status', 'created_at'):
+        history = state.attrs[name].history
+        if history.has_changes():
+            changed[name] = history.deleted[0] if history.deleted else None
+    if not changed:
+        return
+    old = stat_key(changed.get('program_id', target.program_id),
+                   changed.get('status', target.status),
+                   changed.get('created_at', target.created_at))
+    new = stat_key(target.program_id, target.status, target.created_at)
+    if old != new:
+        apply_stat_deltas(connection, {old: -1, new: 1})
+
+@db.event.listens_for(Registration, 'after_delete')
+def _stats_after_delete(mapper, connection, target):
+    apply_stat_deltas(connection, {stat_key(target.program_id, target.status, target.created_at): -1})
+
+def record_tombstones(connection, registration_ids, reason='deleted'):
+    """Record deleted registrations for the change feed, under one change number."""
+    if not registration_ids:
+        return
+    seq = next_change_seq(connection)
+    now = datetime.utcnow()
+    connection.execute(db.insert(RegistrationTombstone), [
+        {'registration_id': reg_id, 'change_seq': seq, 'reason': reason, 'deleted_at': now}
+        for reg_id in registration_ids
+    ])
+
+@db.event.listens_for(Registration, 'after_delete')
+def _tombstone_after_delete(mapper, connection, target):
+    record_tombstones(connection, [target.id])
+
+ProgramSnapshot = namedtuple('ProgramSnapshot', 'id name description location fee')
+
+class ProgramCache:
+    """In-process, thread-safe copy of the program catalogue.
+
+    Programs change rarely, so public pages read them from here instead of
+    the database. The cache is invalidated when a session that touched a
+    Program commits (see ``_track_program_changes``); ``PROGRAM_CACHE_TTL``
+    bounds how long other worker processes can serve a stale copy.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._programs = None
+        self._by_id = {}
+        self._loaded_at = 0.0
+        self.version = None
+        self.last_modified = None
+
+    def _expired(self):
+        ttl = self.app.config['PROGRAM_CACHE_TTL']
+        return ttl > 0 and time.monotonic() - self._loaded_at > ttl
+
+    def _ensure_loaded(self):
+        if self._programs is not None and not self._expired():
+            return
+        with self._lock:
+            if self._programs is not None and not self._expired():
+                return
+            programs = tuple(
+                ProgramSnapshot(p.id, p.name, p.description, p.location, p.fee)
+                for p in Program.query.order_by(Program.id).all()
+            )
+            version = hashlib.sha1(repr(programs).encode('utf-8')).hexdigest()
+            if version != self.version:
+                self.version = version
+                self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            self._by_id = {p.id: p for p in programs}
+            self._programs = programs
+            self._loaded_at = time.monotonic()
+
+    def all(self):
+        self._ensure_loaded()
+        return list(self._programs)
+
+    def get(self, program_id):
+        self._ensure_loaded()
+        return self._by_id.get(program_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._programs = None
+
+program_cache = ProgramCache(app)
+
+@db.event.listens_for(Session, 'after_flush')
+def _track_program_changes(session, flush_context):
+    if any(isinstance(obj, Program) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['programs_changed'] = True
+
+@db.event.listens_for(Session, 'do_orm_execute')
+def _track_program_bulk_changes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Program:
+            orm_execute_state.session.info['programs_changed'] = True
+
+@db.event.listens_for(Session, 'after_commit')
+def _invalidate_program_cache(session):
+    if session.info.pop('programs_changed', False):
+        program_cache.invalidate()
+
+@db.event.listens_for(Session, 'after_soft_rollback')
+def _forget_program_changes(session, previous_transaction):
+    session.info.pop('programs_changed', None)
+
+_template_fingerprints = {}
+
+class AssetManifest:
+    """Maps static file names to their fingerprinted builds.
+
+    Reads the manifest written by build_assets.py and reloads it when a new
+    build replaces it. Without a build every lookup misses and pages use
+    the plain static files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._files = {}
+        self._version = ''
+
+    def _refresh(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            files = {}
+            if mtime is not None:
+                try:
+                    with open(self.path) as f:
+                        files = json.load(f)['files']
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Error loading asset manifest: {str(e)}")
+            self._files = files
+            self._version = hashlib.sha1(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+            self._mtime = mtime
+
+    def get(self, name):
+        self._refresh()
+        return self._files.get(name)
+
+    def state(self):
+        """``(version, last modified)`` of the current build."""
+        self._refresh()
+        modified = None
+        if self._mtime is not None:
+            modified = datetime.fromtimestamp(self._mtime, timezone.utc).replace(microsecond=0)
+        return self._version, modified
+
+asset_manifest = AssetManifest(os.path.join(app.config['ASSET_FOLDER'], 'manifest.json'))
+
+@app.template_global()
+def asset_url(filename, fallback=None):
+    """URL of a static file: its fingerprinted build when there is one,
+    otherwise ``fallback`` (the CDN URL of a vendored file) or the file as is."""
+    built = asset_manifest.get(filename)
+    if built:
+        return url_for('serve_asset', filename=built)
+    if fallback:
+        return fallback
+    return url_for('static', filename=filename)
+
+# Precompressed variants written by build_assets.py, in order of preference
+ASSET_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
 
-        flash('Registration successful! Check your email for the confirmation.', 'success')
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it.
+
+    The name changes whenever the content does, so responses may be cached
+    forever.
+    """
+    path = safe_join(app.config['ASSET_FOLDER'], filename)
+    if path is None or filename.endswith(('.br', '.gz')) or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ASSET_ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(path + suffix):
+            encoding, path = name, path + suffix
+            break
+    response = send_file(path, mimetype=mimetype, max_age=app.config['ASSET_MAX_AGE'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def template_fingerprint(name):
+    """Hash of a template's source and modification time, memoised."""
+    if name not in _template_fingerprints:
+        source, filename, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+        mtime = datetime.fromtimestamp(os.path.getmtime(filename), timezone.utc).replace(microsecond=0)
+        _template_fingerprints[name] = (hashlib.sha1(source.encode('utf-8')).hexdigest(), mtime)
+    return _template_fingerprints[name]
+
+def cached_page(template_name, render, version='', last_modified=None):
+    """Serve a public page with ETag/Last-Modified and Cache-Control.
+
+    ``render`` is only called when the client's copy is stale, so a
+    conditional request skips the template (and any database work inside
+    ``render``). Pages with pending flash messages are never cached.
+    """
+    if session.get('_flashes'):
+        response = make_response(render())
+        response.cache_control.no_store = True
+        return response
+
+    fingerprint, template_mtime = template_fingerprint(template_name)
+    # A new asset build changes the asset URLs inside the page
+    assets_version, assets_modified = asset_manifest.state()
+    etag = hashlib.sha1(f"{fingerprint}:{assets_version}:{version}".encode('utf-8')).hexdigest()
+    last_modified = max(filter(None, (template_mtime, assets_modified, last_modified)))
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(request.if_modified_since) and last_modified <= request.if_modified_since
+
+    response = Response(status=304) if not_modified else make_response(render())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['PUBLIC_PAGE_MAX_AGE']
+    return response
+
+@app.route('/')
+def welcome():
+    try:
+        return cached_page('welcome.html', lambda: render_template('welcome.html'))
+    except Exception as e:
+        print(f"Error in welcome route: {str(e)}")
+        return "An error occurred", 500
+
+@app.route('/register')
+def register():
+    try:
+        programs = program_cache.all()
+        return cached_page(
+            'index.html',
+            lambda: render_template('index.html', programs=programs),
+            version=program_cache.version,
+            last_modified=program_cache.last_modified
+        )
+    except Exception as e:
+        print(f"Error in register route: {str(e)}")
+        flash('Error loading programs. Please try again later.', 'error')
+        return redirect(url_for('welcome'))
+
+# Duplicate-submission suppression. The registration form carries a random
+# idempotency key, filled in by JavaScript so the cached page stays shareable,
+# and a unique index on (program_id, lower(email)) backs the email check.
+# Cancelled and rejected registrations are left out of both, so those people
+# can register again.
+IDEMPOTENCY_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+EMAIL_REUSABLE_STATUSES = ('cancelled', 'rejected')
+EMAIL_TAKEN_MESSAGE = 'Another active registration for this program already uses this email'
+
+def email_unique_filter(model=Registration):
+    """SQL condition for the registrations that keep their email taken."""
+    return db.func.coalesce(model.status, 'pending').notin_(EMAIL_REUSABLE_STATUSES)
+
+def create_email_unique_index(connection):
+    """Create the unique (program, normalized email) index.
+
+    Returns False when existing rows already collide. Migration 7 then stays
+    pending and is retried on every start; ``flask create-email-index`` lists
+    the duplicates that need resolving.
+    """
+    statuses = ', '.join(f"'{status}'" for status in EMAIL_REUSABLE_STATUSES)
+    try:
+        with connection.begin_nested():
+            connection.execute(db.text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_registration_program_email "
+                "ON registration (program_id, lower(email)) "
+                f"WHERE coalesce(status, 'pending') NOT IN ({statuses})"
+            ))
+        return True
     except Exception as e:
+        print(f"Warning: could not create the unique email index: {str(e)}")
+        return False
+
+def request_idempotency_key():
+    """The client's idempotency key from the header or form, if well formed."""
+    key = (request.headers.get('Idempotency-Key') or request.form.get('idempotency_key') or '').strip()
+    return key if IDEMPOTENCY_KEY_PATTERN.match(key) else None
+
+def find_existing_registration(program_id, email, idempotency_key):
+    """Return the registration a submission duplicates, if any."""
+    if idempotency_key:
+        existing = Registration.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+    if email:
+        return Registration.query.filter(
+            Registration.program_id == program_id,
+            db.func.lower(Registration.email) == db.func.lower(email),
+            email_unique_filter()
+        ).first()
+    return None
+
+def save_registration(registration, email_kind):
+    """Insert ``registration`` together with its email.
+
+    Returns ``(registration, created)``. A concurrent duplicate that won the
+    race shows up as a unique index violation, and is returned instead.
+    """
+    db.session.add(registration)
+    queue_email(registration, email_kind)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        existing = find_existing_registration(
+            registration.program_id, registration.email, registration.idempotency_key
+        )
+        if existing is None:
+            raise
+        return existing, False
+    email_workers.notify()
+    return registration, True
+
+@app.route('/register/<int:program_id>', methods=['GET', 'POST'])
+@admission_limited('registration')
+def program_registration(program_id):
+    try:
+        program = program_cache.get(program_id)
+        if program is None:
+            abort(404)
+        if request.method == 'POST':
+            # Get form data
+            name = request.form.get('name')
+            email = (request.form.get('email') or '').strip()
+            phone = request.form.get('phone')
+            organization = request.form.get('organization')
+            designation = request.form.get('designation')
+            expectations = request.form.get('expectations')
+            payment_reference = request.form.get('payment_reference')
+            idempotency_key = request_idempotency_key()
+
+            # A retried submission gets the original result back
+            registration = find_existing_registration(program_id, email, idempotency_key)
+            created = False
+            if registration is None:
+                # Handle file upload
+                receipt = {}
+                if 'payment_receipt' in request.files:
+                    file = request.files['payment_receipt']
+                    if file and file.filename:
+                        receipt = store_receipt(file)
+
+                # Create registration, on the waitlist if the program is full
+                registration = Registration(
+                    program_id=program_id,
+                    status='pending' if reserve_seat(program_id) else 'waitlisted',
+                    name=name,
+                    email=email,
+                    phone=phone,
+                    organization=organization,
+                    designation=designation,
+                    expectations=expectations,
+                    payment_reference=payment_reference,
+                    idempotency_key=idempotency_key,
+                    **receipt
+                )
+
+                # Save to database together with its confirmation email
+                registration, created = save_registration(registration, 'confirmation')
+
+            if not created and (idempotency_key is None or registration.idempotency_key != idempotency_key):
+                flash('You are already registered for this program. '
+                      'Please check your email for your confirmation.', 'info')
+            elif registration.status == 'waitlisted':
+                flash('This program is fully booked, so you have been added to the waitlist. '
+                      'We will email you if a seat becomes available.', 'warning')
+            else:
+                flash(registration_success_message(
+                    registration, 'Registration successful! Please check your email for confirmation.'), 'success')
+
+            return redirect(url_for('welcome'))
+
+        return cached_page(
+            'registration_form.html',
+            lambda: render_template('registration_form.html', program=program),
+            version=f"{program_cache.version}:{program_id}",
+            last_modified=program_cache.last_modified
+        )
+    except ReceiptRejected as e:
+        flash(str(e), 'error')
+        return redirect(url_for('program_registration', program_id=program_id))
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in registration: {str(e)}")
+        flash('An error occurred during registration. Please try again.', 'error')
+        return redirect(url_for('register'))
+
+@app.route('/submit_registration', methods=['POST'])
+@admission_limited('registration')
+def submit_registration():
+    try:
+        program_id = int(request.form.get('program_id'))
+        name = request.form.get('name')
+        email = (request.form.get('email') or '').strip()
+        phone = request.form.get('phone')
+        organization = request.form.get('organization')
+        designation = request.form.get('designation')
+        expectations = request.form.get('expectations')
+        payment_reference = request.form.get('payment_reference')
+        idempotency_key = request_idempotency_key()
+
+        registration = find_existing_registration(program_id, email, idempotency_key)
+        created = False
+        if registration is None:
+            # Handle file upload
+            receipt = {}
+            if 'payment_receipt' in request.files:
+                file = request.files['payment_receipt']
+                if file and file.filename:
+                    receipt = store_receipt(file)
+
+            registration = Registration(
+                program_id=program_id,
+                status='pending' if reserve_seat(program_id) else 'waitlisted',
+                name=name,
+                email=email,
+                phone=phone,
+                organization=organization,
+                designation=designation,
+                expectations=expectations,
+                payment_reference=payment_reference,
+                idempotency_key=idempotency_key,
+                **receipt
+            )
+            registration, created = save_registration(registration, 'ticket')
+
+        if not created and (idempotency_key is None or registration.idempotency_key != idempotency_key):
+            flash('You are already registered for this program.', 'info')
+        elif registration.status == 'waitlisted':
+            flash('This program is fully booked, so you have been added to the waitlist.', 'warning')
+        else:
+            flash(registration_success_message(
+                registration, 'Registration successful! Check your email for the confirmation.'), 'success')
+    except ReceiptRejected as e:
+        flash(str(e), 'error')
+    except Exception as e:
+        db.session.rollback()
         flash('Registration failed. Please try again.', 'error')
         print(f"Error during registration: {str(e)}")
         
     return redirect(url_for('welcome'))
 
 @app.route('/admin/login', methods=['GET', 'POST'])
+@admission_limited('login')
 def admin_login():
     try:
         if request.method == 'POST':
@@ -375,40 +2114,359 @@ def admin_logout():
 @admin_required
 def admin():
     try:
-        # Join with Program to get program details
-        registrations = db.session.query(Registration, Program)\
-            .join(Program, Registration.program_id == Program.id)\
-            .order_by(Registration.created_at.desc())\
-            .all()
-        
-        # Format the data for the template
-        formatted_registrations = []
-        for reg, prog in registrations:
-            formatted_registrations.append({
-                'id': reg.id,
-                'program_name': prog.name,
-                'name': reg.name,
-                'email': reg.email,
-                'phone': reg.phone,
-                'organization': reg.organization,
-                'designation': reg.designation,
-                'status': reg.status,
-                'created_at': reg.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'payment_reference': reg.payment_reference,
-                'payment_receipt': reg.payment_receipt
-            })
-        
-        return render_template('admin.html', registrations=formatted_registrations)
+        # Rows are loaded page by page from admin_registrations_api
+        programs = Program.query.order_by(Program.name).all()
+        return render_template('admin.html', programs=programs)
     except Exception as e:
         print(f"Error in admin route: {str(e)}")
         flash('Error loading registrations. Please try again.', 'error')
         return redirect(url_for('admin_login'))
 
+# Columns the admin listing can be sorted by. Nullable text columns are
+# coalesced so keyset comparisons never hit NULL.
+ADMIN_SORT_COLUMNS = {
+    'id': Registration.id,
+    'created_at': Registration.created_at,
+    'program_name': Program.name,
+    'name': Registration.name,
+    'email': Registration.email,
+    'phone': db.func.coalesce(Registration.phone, ''),
+    'organization': db.func.coalesce(Registration.organization, ''),
+    'designation': db.func.coalesce(Registration.designation, ''),
+    'status': db.func.coalesce(Registration.status, ''),
+    'payment_reference': db.func.coalesce(Registration.payment_reference, ''),
+}
+
+def _parse_date(value, end_of_day=False):
+    parsed = datetime.strptime(value, '%Y-%m-%d')
+    if end_of_day:
+        parsed += timedelta(days=1)
+    return parsed
+
+# Full-text search. SQLite gets an FTS5 table that indexes the registration
+# table in place (external content) and is kept in sync by triggers; Postgres
+# gets a generated tsvector column with a GIN index. Both stay correct for
+# bulk and raw SQL writes because the database maintains them itself.
+SEARCH_FIELDS = ('name', 'email', 'organization', 'designation', 'payment_reference', 'notes')
+SEARCH_MAX_TERMS = 8
+
+# Relative bm25 weights, in SEARCH_FIELDS order
+SEARCH_SQLITE_WEIGHTS = (10.0, 10.0, 4.0, 2.0, 4.0, 1.0)
+
+SEARCH_POSTGRES_VECTOR = """
+    setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(email, '') || ' '
+                          || translate(coalesce(email, ''), '@.', '  ')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(organization, '') || ' '
+                          || coalesce(payment_reference, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(designation, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(notes, '')), 'D')
+"""
+
+registration_fts = db.table('registration_fts', db.column('rowid'), db.column('rank'))
+
+_search_backend = {}
+
+def _sqlite_search_ddl():
+    columns = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{c}' for c in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{c}' for c in SEARCH_FIELDS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS registration_fts USING fts5("
+        f"{columns}, content='registration', content_rowid='id', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS registration_fts_ai AFTER INSERT ON registration BEGIN "
+        f"INSERT INTO registration_fts(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS registration_fts_ad AFTER DELETE ON registration BEGIN "
+        f"INSERT INTO registration_fts(registration_fts, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS registration_fts_au AFTER UPDATE OF {columns} ON registration BEGIN "
+        f"INSERT INTO registration_fts(registration_fts, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO registration_fts(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        "INSERT INTO registration_fts(registration_fts, rank) "
+        f"VALUES ('rank', 'bm25({', '.join(str(w) for w in SEARCH_SQLITE_WEIGHTS)})')",
+    ]
+
+def create_search_index(connection, rebuild=True):
+    """Create the full-text index for this database and (re)fill it.
+
+    Idempotent. If the database cannot build the index (SQLite compiled
+    without FTS5, Postgres older than 12) a warning is printed and search
+    falls back to LIKE matching.
+    """
+    dialect = connection.dialect.name
+    _search_backend.clear()
+    try:
+        with connection.begin_nested():
+            if dialect == 'sqlite':
+                for statement in _sqlite_search_ddl():
+                    connection.execute(db.text(statement))
+                if rebuild:
+                    connection.execute(db.text(
+                        "INSERT INTO registration_fts(registration_fts) VALUES ('rebuild')"
+                    ))
+            elif dialect == 'postgresql':
+                # The generated column is computed for existing rows when added
+                connection.execute(db.text(
+                    "ALTER TABLE registration ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                    f"GENERATED ALWAYS AS ({SEARCH_POSTGRES_VECTOR}) STORED"
+                ))
+                connection.execute(db.text(
+                    "CREATE INDEX IF NOT EXISTS ix_registration_search "
+                    "ON registration USING GIN (search_vector)"
+                ))
+            else:
+                print(f"Full-text search is not supported on {dialect}; using LIKE matching")
+        return True
+    except Exception as e:
+        print(f"Warning: could not create the search index: {str(e)}")
+        return False
+
+def search_backend():
+    """Return 'fts5', 'tsvector' or None for this database, cached per process."""
+    if 'name' not in _search_backend:
+        backend = None
+        inspector = db.inspect(db.engine)
+        if db.engine.dialect.name == 'sqlite':
+            if 'registration_fts' in inspector.get_table_names():
+                backend = 'fts5'
+        elif db.engine.dialect.name == 'postgresql':
+            if 'search_vector' in {c['name'] for c in inspector.get_columns('registration')}:
+                backend = 'tsvector'
+        _search_backend['name'] = backend
+    return _search_backend['name']
+
+def search_terms(text):
+    """Split free text into lower-cased word tokens safe to put in a query."""
+    return re.findall(r'\w+', text.lower())[:SEARCH_MAX_TERMS]
+
+def fts_match(terms):
+    """FTS5 MATCH clause requiring every term as a prefix."""
+    return db.literal_column('registration_fts').op('MATCH')(' '.join(f'"{t}"*' for t in terms))
+
+def pg_tsquery(terms):
+    return db.func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in terms))
+
+registration_search_vector = db.literal_column('registration.search_vector')
+
+def search_clauses(text, model=Registration):
+    """Filter clauses matching registrations against free text.
+
+    Uses the full-text index when there is one, where every term must match
+    as a word prefix. Otherwise (and for the archive, which has no index)
+    falls back to substring matching.
+    """
+    terms = search_terms(text)
+    backend = search_backend() if terms and model is Registration else None
+    if backend == 'fts5':
+        return [Registration.id.in_(db.select(registration_fts.c.rowid).where(fts_match(terms)))]
+    if backend == 'tsvector':
+        return [registration_search_vector.op('@@')(pg_tsquery(terms))]
+    pattern = f"%{text}%"
+    return [db.or_(
+        model.name.ilike(pattern),
+        model.email.ilike(pattern),
+        model.organization.ilike(pattern),
+        model.payment_reference.ilike(pattern)
+    )]
+
+def registration_filters(args, model=Registration):
+    """Build SQL filter clauses for Registration (or ``model``) from request arguments.
+
+    Understands ``program_id``, ``status``, ``date_from``/``date_to``
+    (YYYY-MM-DD, inclusive) and a free-text ``q``.
+    """
+    clauses = []
+    if args.get('program_id'):
+        clauses.append(model.program_id == int(args['program_id']))
+    if args.get('status'):
+        clauses.append(model.status == args['status'])
+    if args.get('date_from'):
+        clauses.append(model.created_at >= _parse_date(args['date_from']))
+    if args.get('date_to'):
+        clauses.append(model.created_at < _parse_date(args['date_to'], end_of_day=True))
+    search = (args.get('q') or '').strip()
+    if search:
+        clauses.extend(search_clauses(search, model))
+    return clauses
+
+def encode_cursor(sort, direction, value, last_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, direction, value, last_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    sort, direction, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if sort == 'created_at' and value is not None:
+        value = datetime.fromisoformat(value)
+    return sort, direction, value, last_id
+
+def format_admin_row(reg, program_name):
+    return {
+        'id': reg.id,
+        'program_name': program_name,
+        'name': reg.name,
+        'email': reg.email,
+        'phone': reg.phone,
+        'organization': reg.organization,
+        'designation': reg.designation,
+        'status': reg.status,
+        'created_at': reg.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'payment_reference': reg.payment_reference,
+        'payment_receipt': reg.payment_receipt
+    }
+
+@app.route('/api/admin/registrations')
+@admin_required
+def admin_registrations_api():
+    """Server-side data source for the admin table.
+
+    Speaks the DataTables server-side protocol (draw/start/length/search/
+    order) and adds keyset pagination: each response carries ``next_cursor``,
+    and passing it back as ``cursor`` fetches the following page with an
+    indexed range scan instead of an OFFSET. ``start`` is only used when the
+    client jumps to a page it has no cursor for. Counts are only computed
+    when ``counts=1``, so paging through a large table costs O(page size).
+    """
+    try:
+        args = request.args
+        length = max(1, min(int(args.get('length', 25)), 500))
+        start = max(0, int(args.get('start', 0)))
+
+        sort, direction = 'created_at', 'desc'
+        order_column = args.get('order[0][column]')
+        if order_column is not None:
+            sort = args.get(f'columns[{order_column}][data]', sort)
+            direction = 'asc' if args.get('order[0][dir]') == 'asc' else 'desc'
+        sort = args.get('sort', sort)
+        direction = args.get('dir', direction)
+        if sort not in ADMIN_SORT_COLUMNS or direction not in ('asc', 'desc'):
+            return jsonify({'error': 'Invalid sort'}), 400
+
+        filter_args = dict(args)
+        if args.get('search[value]'):
+            filter_args['q'] = args['search[value]']
+        clauses = registration_filters(filter_args)
+
+        sort_column = ADMIN_SORT_COLUMNS[sort]
+        query = db.session.query(Registration, Program.name, sort_column)\
+            .join(Program, Registration.program_id == Program.id)\
+            .filter(*clauses)
+
+        cursor = args.get('cursor')
+        if cursor:
+            cursor_sort, cursor_direction, value, last_id = decode_cursor(cursor)
+            if (cursor_sort, cursor_direction) != (sort, direction):
+                return jsonify({'error': 'Cursor does not match sort order'}), 400
+            key = db.tuple_(sort_column, Registration.id)
+            query = query.filter(key < (value, last_id) if direction == 'desc' else key > (value, last_id))
+
+        if direction == 'desc':
+            query = query.order_by(sort_column.desc(), Registration.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Registration.id.asc())
+
+        if not cursor and start:
+            query = query.offset(start)
+        rows = query.limit(length + 1).all()
+
+        has_more = len(rows) > length
+        rows = rows[:length]
+        next_cursor = None
+        if has_more:
+            last_reg, _, last_value = rows[-1]
+            next_cursor = encode_cursor(sort, direction, last_value, last_reg.id)
+
+        response = {
+            'draw': int(args.get('draw', 0)),
+            'data': [format_admin_row(reg, program_name) for reg, program_name, _ in rows],
+            'next_cursor': next_cursor
+        }
+        if args.get('counts') == '1':
+            response['recordsTotal'] = db.session.query(db.func.count(Registration.id)).scalar()
+            response['recordsFiltered'] = db.session.query(db.func.count(Registration.id))\
+                .filter(*clauses).scalar() if clauses else response['recordsTotal']
+        return jsonify(response)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+    except Exception as e:
+        print(f"Error in admin registrations API: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+SEARCH_MAX_PER_PAGE = 100
+
+@app.route('/api/registrations/search')
+@admin_required
+def search_registrations():
+    """Ranked full-text search over registrations.
+
+    ``q`` is matched against name, email, organization, designation,
+    payment reference and notes; each word matches as a prefix. Accepts the
+    listing filters (``program_id``, ``status``, ``date_from``/``date_to``)
+    and ``page``/``per_page``. ``has_more`` replaces a total count so a page
+    only costs the matches that have to be ranked.
+    """
+    try:
+        args = request.args
+        page = max(1, int(args.get('page', 1)))
+        per_page = max(1, min(int(args.get('per_page', 20)), SEARCH_MAX_PER_PAGE))
+        terms = search_terms(args.get('q', ''))
+        if not terms:
+            return jsonify({'error': 'Search query is required'}), 400
+
+        clauses = registration_filters({k: v for k, v in args.items() if k != 'q'})
+        backend = search_backend()
+        if backend == 'fts5':
+            rank = registration_fts.c.rank
+            query = db.session.query(Registration, Program.name, rank)\
+                .join(registration_fts, registration_fts.c.rowid == Registration.id)\
+                .filter(fts_match(terms))\
+                .order_by(rank, Registration.id.desc())
+        elif backend == 'tsvector':
+            tsquery = pg_tsquery(terms)
+            rank = db.func.ts_rank(registration_search_vector, tsquery)
+            query = db.session.query(Registration, Program.name, rank)\
+                .filter(registration_search_vector.op('@@')(tsquery))\
+                .order_by(rank.desc(), Registration.id.desc())
+        else:
+            query = db.session.query(Registration, Program.name, db.literal(None))\
+                .filter(*search_clauses(args.get('q', '').strip()))\
+                .order_by(Registration.created_at.desc(), Registration.id.desc())
+
+        rows = query.join(Program, Registration.program_id == Program.id)\
+            .filter(*clauses)\
+            .offset((page - 1) * per_page)\
+            .limit(per_page + 1)\
+            .all()
+
+        results = []
+        for reg, program_name, score in rows[:per_page]:
+            row = format_admin_row(reg, program_name)
+            row['notes'] = reg.notes
+            # bm25 is lower-is-better; report higher-is-better for both backends
+            row['score'] = None if score is None else round(-score if backend == 'fts5' else score, 4)
+            results.append(row)
+        return jsonify({
+            'results': results,
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(rows) > per_page,
+            'indexed': backend is not None
+        })
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+    except Exception as e:
+        print(f"Error searching registrations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/registrations/<int:id>', methods=['GET'])
 @admin_required
 def get_registration(id):
     try:
-        registration = Registration.query.get_or_404(id)
+        # Registrations of finished programs may have been archived
+        registration = db.session.get(Registration, id) or db.session.get(RegistrationArchive, id)
+        if registration is None:
+            return jsonify({'error': 'Registration not found'}), 404
         return jsonify({
             'id': registration.id,
             'program_id': registration.program_id,
@@ -422,7 +2480,8 @@ def get_registration(id):
             'status': registration.status,
             'payment_reference': registration.payment_reference,
             'payment_receipt': registration.payment_receipt,
-            'notes': registration.notes
+            'notes': registration.notes,
+            'archived': isinstance(registration, RegistrationArchive)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -447,14 +2506,21 @@ def update_registration(id):
         if 'expectations' in data:
             registration.expectations = data['expectations']
         if 'status' in data:
+            held = holds_seat(registration.status)
             registration.status = data['status']
+            if held != holds_seat(registration.status):
+                adjust_seats(registration.program_id, 1 if not held else -1)
         if 'payment_reference' in data:
             registration.payment_reference = data['payment_reference']
         if 'notes' in data:
             registration.notes = data['notes']
         
         db.session.commit()
+        email_workers.notify()
         return jsonify({'message': 'Registration updated successfully'})
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': EMAIL_TAKEN_MESSAGE}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -463,48 +2529,440 @@ def update_registration(id):
 def delete_registration(id):
     try:
         registration = Registration.query.get_or_404(id)
+        program_id, held = registration.program_id, holds_seat(registration.status)
         db.session.delete(registration)
+        if held:
+            adjust_seats(program_id, -1)
         db.session.commit()
+        email_workers.notify()
         return '', 204
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Fields an admin may change through the batch API (mirrors update_registration)
+REGISTRATION_EDITABLE_FIELDS = ('name', 'email', 'phone', 'organization', 'designation',
+                                'expectations', 'status', 'payment_reference', 'notes')
+BATCH_MAX_IDS = 10000
+
+def detach_outbox_entries(registration_ids):
+    """Unlink outbox rows from registrations about to be deleted in bulk.
+
+    ``registration_ids`` may be a list or a subquery. Emails still waiting to
+    be sent are marked failed rather than retried against a missing row.
+    """
+    db.session.execute(
+        db.update(EmailOutbox)
+        .where(EmailOutbox.registration_id.in_(registration_ids), EmailOutbox.status.in_(('queued', 'sending')))
+        .values(status='failed', last_error='Registration deleted', claim_token=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.update(EmailOutbox)
+        .where(EmailOutbox.registration_id.in_(registration_ids))
+        .values(registration_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+@app.route('/api/registrations/batch', methods=['POST'])
+@admin_required
+def batch_registrations():
+    """Apply one update or delete to many registrations in a single statement.
+
+    Body: ``{"action": "update"|"delete", "ids": [...]}`` or
+    ``{"action": ..., "filter": {"program_id": .., "status": .., ...}}``,
+    plus ``"changes": {...}`` for updates. Runs as one set-based
+    UPDATE/DELETE in one transaction and reports the outcome per id.
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action not in ('update', 'delete'):
+            return jsonify({'error': "action must be 'update' or 'delete'"}), 400
+
+        ids = data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not ids or len(ids) > BATCH_MAX_IDS:
+                return jsonify({'error': f'ids must be a list of 1 to {BATCH_MAX_IDS} ids'}), 400
+            ids = [int(i) for i in ids]
+            clauses = [Registration.id.in_(ids)]
+        else:
+            clauses = registration_filters(data.get('filter') or {})
+            if not clauses:
+                return jsonify({'error': 'Either ids or a non-empty filter is required'}), 400
+
+        if action == 'update':
+            changes = data.get('changes') or {}
+            unknown = set(changes) - set(REGISTRATION_EDITABLE_FIELDS)
+            if not changes or unknown:
+                return jsonify({'error': f"changes must only contain {', '.join(REGISTRATION_EDITABLE_FIELDS)}"}), 400
+            seats, stats = {}, {}
+            if 'status' in changes:
+                seats = seat_deltas(clauses, holds_seat(changes['status']))
+                stats = stat_deltas_for(clauses, changes['status'] or 'pending')
+            statement = db.update(Registration).where(*clauses).values(**changes)
+        else:
+            seats = seat_deltas(clauses, holds_after=False)
+            stats = stat_deltas_for(clauses)
+            detach_outbox_entries(db.select(Registration.id).where(*clauses))
+            statement = db.delete(Registration).where(*clauses)
+
+        affected = db.session.execute(
+            statement.returning(Registration.id).execution_options(synchronize_session=False)
+        ).scalars().all()
+        # Set-based statements skip mapper events, so apply the stats here
+        apply_stat_deltas(db.session.connection(), stats)
+        if action == 'delete':
+            record_tombstones(db.session.connection(), affected)
+        for program_id, delta in seats.items():
+            adjust_seats(program_id, delta)
+        db.session.commit()
+        email_workers.notify()
+
+        outcome = 'updated' if action == 'update' else 'deleted'
+        affected_set = set(affected)
+        if ids is not None:
+            results = {str(i): (outcome if i in affected_set else 'not_found') for i in ids}
+        else:
+            results = {str(i): outcome for i in sorted(affected_set)}
+        return jsonify({'action': action, 'affected': len(affected_set), 'results': results})
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Invalid request: {str(e)}'}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': EMAIL_TAKEN_MESSAGE}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in batch registration update: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Fields the bulk read API can select, each read straight from its column
+BULK_FIELDS = {
+    'id': Registration.id,
+    'program_id': Registration.program_id,
+    'program_name': Program.name,
+    'name': Registration.name,
+    'email': Registration.email,
+    'phone': Registration.phone,
+    'organization': Registration.organization,
+    'designation': Registration.designation,
+    'expectations': Registration.expectations,
+    'created_at': Registration.created_at,
+    'updated_at': Registration.updated_at,
+    'status': Registration.status,
+    'payment_reference': Registration.payment_reference,
+    'payment_receipt': Registration.payment_receipt,
+    'notes': Registration.notes,
+    'change_seq': Registration.change_seq,
+}
+# The free-text fields can be large, so they are only sent when asked for
+BULK_DEFAULT_FIELDS = [name for name in BULK_FIELDS if name not in ('expectations', 'notes')]
+
+def _split_list(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return list(value)
+
+def generate_bulk_rows(fields, rows, fmt):
+    """Serialize bulk read rows as NDJSON objects or one compact JSON document,
+    yielding text roughly EXPORT_CHUNK_BYTES at a time."""
+    chunk = []
+    size = 0
+    if fmt == 'json':
+        header = json.dumps({'fields': fields}, separators=(',', ':'))
+        chunk.append(header[:-1] + ',"rows":[')
+    first = True
+    for row in rows:
+        values = [value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else value
+                  for value in row]
+        if fmt == 'json':
+            line = ('' if first else ',') + json.dumps(values, separators=(',', ':'))
+        else:
+            line = json.dumps(dict(zip(fields, values)), separators=(',', ':')) + '\n'
+        first = False
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if fmt == 'json':
+        chunk.append(']}')
+    yield ''.join(chunk)
+
+@app.route('/api/registrations/bulk', methods=['GET', 'POST'])
+@admin_required
+def bulk_registrations():
+    """Read many registrations in one request.
+
+    Takes ``ids`` (a list, or comma-separated in the query string) or the
+    listing filters (``program_id``, ``status``, ``date_from``/``date_to``,
+    ``q``; under ``"filter"`` in a POST body), plus ``fields`` to choose
+    the columns (see BULK_FIELDS; ``expectations`` and ``notes`` only when
+    listed). Rows come in id order as NDJSON, or with ``format=json`` as
+    ``{"fields": [...], "rows": [[...], ...]}``. The ETag changes whenever
+    a matching registration is added, edited or deleted.
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            filters = data.get('filter') or {}
+        else:
+            data = filters = request.args
+        fields = _split_list(data.get('fields') or BULK_DEFAULT_FIELDS)
+        unknown = [name for name in fields if name not in BULK_FIELDS]
+        if not fields or unknown:
+            return jsonify({'error': f"fields must only contain {', '.join(BULK_FIELDS)}"}), 400
+        fmt = data.get('format') or 'ndjson'
+        if fmt not in ('ndjson', 'json'):
+            return jsonify({'error': "format must be 'ndjson' or 'json'"}), 400
+
+        ids = data.get('ids')
+        if ids is not None:
+            ids = [int(i) for i in _split_list(ids)]
+            if not ids or len(ids) > BATCH_MAX_IDS:
+                return jsonify({'error': f'ids must be a list of 1 to {BATCH_MAX_IDS} ids'}), 400
+            clauses = [Registration.id.in_(ids)]
+        else:
+            clauses = registration_filters(filters)
+            if not clauses:
+                return jsonify({'error': 'Either ids or a non-empty filter is required'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+
+    try:
+        # Every write takes a new, higher change number and deletes lower the
+        # count, so the two together identify the state of the matching rows
+        count, last_change = db.session.query(
+            db.func.count(Registration.id), db.func.max(Registration.change_seq)
+        ).filter(*clauses).one()
+        program_version = program_cache.version if 'program_name' in fields else ''
+        etag = hashlib.sha1(
+            f"{','.join(fields)}:{fmt}:{count}:{last_change}:{program_version}".encode('utf-8')
+        ).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            query = db.select(*[BULK_FIELDS[name] for name in fields]).select_from(Registration)
+            if 'program_name' in fields:
+                query = query.join(Program, Registration.program_id == Program.id)
+            query = query.where(*clauses)\
+                .order_by(Registration.id)\
+                .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+            rows = (row for partition in db.session.execute(query).partitions() for row in partition)
+            response = Response(
+                stream_with_context(generate_bulk_rows(fields, rows, fmt)),
+                mimetype='application/json' if fmt == 'json' else 'application/x-ndjson'
+            )
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        print(f"Error reading registrations in bulk: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+# Within one change number upserts sort before deletes
+CHANGE_KIND_UPSERT, CHANGE_KIND_DELETE = 0, 1
+
+def parse_change_cursor(value):
+    """Parse ``since``: a bare change number or a ``seq.kind.id`` cursor."""
+    parts = (value or '-1').split('.')
+    if len(parts) == 1:
+        # Everything after change number N: past N's deletes as well
+        return int(parts[0]), CHANGE_KIND_DELETE, float('inf')
+    seq, kind, row_id = (int(part) for part in parts)
+    if kind not in (CHANGE_KIND_UPSERT, CHANGE_KIND_DELETE):
+        raise ValueError(f'Invalid cursor: {value}')
+    return seq, kind, row_id
+
+def _after_cursor(seq_column, id_column, kind, cursor):
+    """Clause selecting rows of ``kind`` that sort after ``cursor``."""
+    seq, cursor_kind, row_id = cursor
+    if kind > cursor_kind:
+        return seq_column >= seq
+    if kind < cursor_kind or row_id == float('inf'):
+        return seq_column > seq
+    return db.tuple_(seq_column, id_column) > db.tuple_(seq, row_id)
+
+def registration_change(reg):
+    return {
+        'op': 'upsert',
+        'change_seq': reg.change_seq,
+        'registration': {
+            'id': reg.id,
+            'program_id': reg.program_id,
+            'name': reg.name,
+            'email': reg.email,
+            'phone': reg.phone,
+            'organization': reg.organization,
+            'designation': reg.designation,
+            'expectations': reg.expectations,
+            'created_at': reg.created_at.strftime('%Y-%m-%d %H:%M:%S') if reg.created_at else None,
+            'updated_at': reg.updated_at.strftime('%Y-%m-%d %H:%M:%S') if reg.updated_at else None,
+            'status': reg.status,
+            'payment_reference': reg.payment_reference,
+            'payment_receipt': reg.payment_receipt,
+            'notes': reg.notes
+        }
+    }, (reg.change_seq, CHANGE_KIND_UPSERT, reg.id)
+
+def tombstone_change(tombstone):
+    return {
+        'op': 'delete',
+        'change_seq': tombstone.change_seq,
+        'id': tombstone.registration_id,
+        'reason': tombstone.reason,
+        'deleted_at': tombstone.deleted_at.strftime('%Y-%m-%d %H:%M:%S')
+    }, (tombstone.change_seq, CHANGE_KIND_DELETE, tombstone.id)
+
+@app.route('/api/registrations/changes')
+@admin_required
+def registration_changes():
+    """Stream registrations created, updated or deleted after a cursor.
+
+    ``since`` is the ``cursor`` returned by the previous call (or a change
+    number; 0 or absent starts from the beginning). Streams NDJSON: one
+    ``upsert`` or ``delete`` line per change in change order, then a line
+    with the ``cursor`` to resume from and ``has_more``. Rows touched by one
+    statement share a change number, so a sync may see several rows per
+    number; the cursor keeps pages from splitting or repeating them.
+    """
+    try:
+        cursor = parse_change_cursor(request.args.get('since'))
+        limit = max(1, min(int(request.args.get('limit', CHANGES_DEFAULT_LIMIT)), CHANGES_MAX_LIMIT))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+
+    def generate():
+        upserts = db.session.query(Registration)\
+            .filter(_after_cursor(Registration.change_seq, Registration.id, CHANGE_KIND_UPSERT, cursor))\
+            .order_by(Registration.change_seq, Registration.id)\
+            .limit(limit + 1)\
+            .yield_per(500)
+        deletes = db.session.query(RegistrationTombstone)\
+            .filter(_after_cursor(RegistrationTombstone.change_seq, RegistrationTombstone.id,
+                                  CHANGE_KIND_DELETE, cursor))\
+            .order_by(RegistrationTombstone.change_seq, RegistrationTombstone.id)\
+            .limit(limit + 1)\
+            .yield_per(500)
+        changes = heapq.merge((registration_change(reg) for reg in upserts),
+                              (tombstone_change(tombstone) for tombstone in deletes),
+                              key=lambda change: change[1])
+        position = cursor
+        sent = 0
+        has_more = False
+        for line, key in changes:
+            if sent == limit:
+                has_more = True
+                break
+            yield json.dumps(line) + '\n'
+            position = key
+            sent += 1
+        if position[2] == float('inf'):
+            next_cursor = str(position[0])
+        else:
+            next_cursor = '.'.join(str(part) for part in position)
+        yield json.dumps({'cursor': next_cursor, 'has_more': has_more}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Column layouts of the two CSV exports: (header, column) pairs
+ADMIN_EXPORT_COLUMNS = [
+    ('ID', Registration.id),
+    ('Program', Program.name),
+    ('Name', Registration.name),
+    ('Email', Registration.email),
+    ('Phone', Registration.phone),
+    ('Organization', Registration.organization),
+    ('Designation', Registration.designation),
+    ('Expectations', Registration.expectations),
+    ('Status', Registration.status),
+    ('Registration Date', Registration.created_at),
+    ('Payment Reference', Registration.payment_reference),
+    ('Payment Receipt', Registration.payment_receipt),
+    ('Notes', Registration.notes),
+]
+
+LEGACY_EXPORT_COLUMNS = [
+    ('ID', Registration.id),
+    ('Program', Program.name),
+    ('Name', Registration.name),
+    ('Email', Registration.email),
+    ('Phone', Registration.phone),
+    ('Organization', Registration.organization),
+    ('Designation', Registration.designation),
+    ('Expectations', Registration.expectations),
+    ('Registration Date', Registration.created_at),
+    ('Status', Registration.status),
+    ('Payment Reference', Registration.payment_reference),
+    ('Payment Receipt', Registration.payment_receipt),
+    ('Notes', Registration.notes),
+]
+
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def iter_export_rows(columns, clauses, model=Registration):
+    """Yield plain row tuples for an export, fetched in server-side chunks.
+
+    Selects only the exported columns (no ORM objects, no per-row lazy
+    loads) and streams them with ``yield_per`` so memory stays bounded.
+    """
+    query = db.select(*[column for _, column in columns])\
+        .join_from(model, Program, model.program_id == Program.id)\
+        .where(*clauses)\
+        .order_by(model.created_at.desc(), model.id.desc())\
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    for partition in db.session.execute(query).partitions():
+        yield from partition
+
+def generate_csv(header, rows):
+    """Write ``rows`` as CSV, yielding text roughly EXPORT_CHUNK_BYTES at a time."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([
+            value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else value
+            for value in row
+        ])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def gzip_stream(chunks):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def csv_export_response(columns, clauses, filename='registrations.csv', model=Registration):
+    """Stream a CSV export, gzipped when the request asks for ``gzip=1``."""
+    chunks = generate_csv([header for header, _ in columns], iter_export_rows(columns, clauses, model))
+    if request.args.get('gzip') == '1':
+        return Response(
+            stream_with_context(gzip_stream(chunks)),
+            mimetype='application/gzip',
+            headers={'Content-Disposition': f'attachment; filename={filename}.gz'}
+        )
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 @app.route('/export')
 @admin_required
 def export_csv():
     try:
-        registrations = Registration.query.order_by(Registration.created_at.desc()).all()
-        
-        si = StringIO()
-        cw = csv.writer(si)
-        
-        # Write headers
-        cw.writerow(['ID', 'Program', 'Name', 'Email', 'Phone', 'Organization', 'Designation', 
-                    'Expectations', 'Registration Date', 'Status', 
-                    'Payment Reference', 'Payment Receipt', 'Notes'])
-        
-        # Write data
-        for r in registrations:
-            cw.writerow([
-                r.id,
-                r.program.name,
-                r.name,
-                r.email,
-                r.phone,
-                r.organization,
-                r.designation,
-                r.expectations,
-                r.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                r.status,
-                r.payment_reference,
-                r.payment_receipt,
-                r.notes
-            ])
-        
-        output = make_response(si.getvalue())
-        output.headers["Content-Disposition"] = "attachment; filename=registrations.csv"
-        output.headers["Content-type"] = "text/csv"
-        return output
+        return csv_export_response(LEGACY_EXPORT_COLUMNS, registration_filters(request.args))
     except Exception as e:
         flash('Error exporting data', 'error')
         return redirect(url_for('admin'))
@@ -513,58 +2971,266 @@ def export_csv():
 @admin_required
 def export_registrations():
     try:
-        # Query registrations with program information
-        registrations = db.session.query(Registration, Program)\
-            .join(Program, Registration.program_id == Program.id)\
-            .order_by(Registration.created_at.desc())\
-            .all()
-
-        # Create a string buffer for CSV data
-        output = StringIO()
-        writer = csv.writer(output)
-
-        # Write headers
-        headers = [
-            'ID', 'Program', 'Name', 'Email', 'Phone', 'Organization', 
-            'Designation', 'Expectations', 'Status', 'Registration Date',
-            'Payment Reference', 'Payment Receipt', 'Notes'
-        ]
-        writer.writerow(headers)
-
-        # Write registration data
-        for reg, prog in registrations:
-            row = [
-                reg.id,
-                prog.name,
-                reg.name,
-                reg.email,
-                reg.phone,
-                reg.organization,
-                reg.designation,
-                reg.expectations,
-                reg.status,
-                reg.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                reg.payment_reference,
-                reg.payment_receipt,
-                reg.notes
-            ]
-            writer.writerow(row)
-
-        # Create the response
-        output.seek(0)
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': 'attachment; filename=registrations.csv',
-                'Content-Type': 'text/csv'
-            }
-        )
+        return csv_export_response(ADMIN_EXPORT_COLUMNS, registration_filters(request.args))
     except Exception as e:
         print(f"Error exporting registrations: {str(e)}")
         flash('Error exporting registrations', 'error')
         return redirect(url_for('admin'))
 
+IMPORT_FIELDS = ('name', 'email', 'phone', 'organization', 'designation', 'expectations',
+                 'status', 'payment_reference', 'notes')
+IMPORT_HEADER_ALIASES = {
+    'full_name': 'name',
+    'email_address': 'email',
+    'phone_number': 'phone',
+    'organisation': 'organization',
+    'role': 'designation',
+    'program': 'program_name',
+    'programme': 'program_name',
+    'transaction_reference': 'payment_reference',
+    'registration_date': 'created_at',
+}
+IMPORT_MAX_ERRORS = 1000
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+def iter_import_records(stream, fmt):
+    """Yield ``(line_number, record)`` pairs from a CSV or JSONL text stream."""
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = e
+                yield line_number, record
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+
+def normalize_import_record(record, programs):
+    """Validate and normalise one imported row into Registration values.
+
+    ``programs`` maps lower-cased program ids, names and locations to ids.
+    Raises ValueError with a readable message for invalid rows.
+    """
+    if isinstance(record, Exception):
+        raise ValueError(f'Invalid JSON: {record}')
+    if not isinstance(record, dict):
+        raise ValueError('Row is not an object')
+
+    values = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        key = key.strip().lower().replace(' ', '_').replace('-', '_')
+        key = IMPORT_HEADER_ALIASES.get(key, key)
+        if isinstance(value, str):
+            value = value.strip()
+        values[key] = value if value not in ('', None) else None
+
+    program_key = values.get('program_id') or values.get('program_name')
+    program_id = programs.get(str(program_key).lower()) if program_key is not None else None
+    if program_id is None:
+        raise ValueError(f'Unknown program: {program_key}' if program_key else 'Missing program')
+
+    row = {'program_id': program_id}
+    for field in IMPORT_FIELDS:
+        value = values.get(field)
+        if value is not None:
+            value = str(value)
+            limit = getattr(Registration.__table__.c[field].type, 'length', None)
+            if limit and len(value) > limit:
+                raise ValueError(f'{field} is longer than {limit} characters')
+            row[field] = value
+
+    if not row.get('name'):
+        raise ValueError('Missing name')
+    email = (row.get('email') or '').lower()
+    if not EMAIL_PATTERN.match(email):
+        raise ValueError(f"Invalid email: {row.get('email')}")
+    row['email'] = email
+
+    if values.get('created_at'):
+        try:
+            row['created_at'] = datetime.fromisoformat(str(values['created_at']))
+        except ValueError:
+            raise ValueError(f"Invalid registration date: {values['created_at']}")
+    return row
+
+def _insert_import_batch(batch, queue_emails):
+    """Insert one batch of ``(line_number, row)`` in its own transaction.
+
+    Returns the per-row errors. If the batch as a whole is rejected by the
+    database it is retried row by row so only the offending rows fail.
+    """
+    def insert_rows(rows):
+        # Seat-holding rows take seats in order; the rest of them are waitlisted
+        wanted = {}
+        for row in rows:
+            if holds_seat(row.get('status')):
+                wanted[row['program_id']] = wanted.get(row['program_id'], 0) + 1
+        granted = {program_id: reserve_seats(program_id, count) for program_id, count in wanted.items()}
+        # Copy the rows: a failed batch is retried row by row from the originals.
+        # The batch shares one change number instead of taking one per row.
+        change_seq = next_change_seq(db.session.connection())
+        rows = [dict(row, change_seq=change_seq) for row in rows]
+        for row in rows:
+            if holds_seat(row.get('status')):
+                if granted[row['program_id']]:
+                    granted[row['program_id']] -= 1
+                else:
+                    row['status'] = 'waitlisted'
+
+        inserted = db.session.execute(
+            db.insert(Registration).returning(Registration.id, Registration.email, Registration.program_id,
+                                              Registration.status, Registration.created_at),
+            rows
+        ).all()
+        # Bulk inserts skip mapper events, so update the stats here
+        apply_stat_deltas(db.session.connection(), Counter(
+            stat_key(program_id, status, created_at) for _, _, program_id, status, created_at in inserted
+        ))
+        if queue_emails:
+            db.session.execute(db.insert(EmailOutbox), [
+                {'registration_id': reg_id, 'kind': 'confirmation', 'recipient': email}
+                for reg_id, email, _, _, _ in inserted
+            ])
+
+    try:
+        insert_rows([row for _, row in batch])
+        db.session.commit()
+        return []
+    except Exception:
+        db.session.rollback()
+
+    errors = []
+    for line_number, row in batch:
+        try:
+            insert_rows([row])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            errors.append({'line': line_number, 'error': str(getattr(e, 'orig', e))})
+    return errors
+
+def import_registrations(records, batch_size=1000, queue_emails=False, dry_run=False):
+    """Validate and insert registrations from ``iter_import_records``.
+
+    Rows are inserted with executemany in transactions of ``batch_size``;
+    invalid rows are skipped and reported. Returns a summary dict.
+    """
+    programs = {}
+    for program in Program.query.all():
+        for key in (program.id, program.name, program.location):
+            if key is not None:
+                programs[str(key).lower()] = program.id
+
+    report = {'processed': 0, 'imported': 0, 'failed': 0, 'errors': [], 'dry_run': dry_run}
+
+    def record_errors(errors):
+        report['failed'] += len(errors)
+        room = IMPORT_MAX_ERRORS - len(report['errors'])
+        report['errors'].extend(errors[:max(room, 0)])
+
+    def flush(batch):
+        if dry_run:
+            report['imported'] += len(batch)
+            return
+        errors = _insert_import_batch(batch, queue_emails)
+        report['imported'] += len(batch) - len(errors)
+        record_errors(errors)
+
+    batch = []
+    for line_number, record in records:
+        report['processed'] += 1
+        try:
+            batch.append((line_number, normalize_import_record(record, programs)))
+        except ValueError as e:
+            record_errors([{'line': line_number, 'error': str(e)}])
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if queue_emails and report['imported']:
+        email_workers.notify()
+    return report
+
+def _import_format(filename, requested=None):
+    if requested:
+        return requested
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+@app.cli.command('import-registrations')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+@click.option('--send-emails', is_flag=True, help='Queue confirmation emails for imported rows.')
+@click.option('--dry-run', is_flag=True, help='Validate only; do not insert anything.')
+def import_registrations_command(path, fmt, batch_size, send_emails, dry_run):
+    """Bulk import registrations from a CSV or JSONL file."""
+    started = time.monotonic()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        report = import_registrations(
+            iter_import_records(f, _import_format(path, fmt)),
+            batch_size=batch_size,
+            queue_emails=send_emails,
+            dry_run=dry_run
+        )
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['error']}")
+    click.echo(f"Processed {report['processed']} rows, imported {report['imported']}, "
+               f"failed {report['failed']} in {time.monotonic() - started:.1f}s")
+
+@app.cli.command('set-capacity')
+@click.argument('program_id', type=int)
+@click.argument('capacity')
+def set_capacity_command(program_id, capacity):
+    """Set a program's capacity (a number, or 'none' for unlimited)."""
+    program = db.session.get(Program, program_id)
+    if program is None:
+        raise click.ClickException(f'Program {program_id} not found')
+    program.capacity = None if capacity.lower() == 'none' else int(capacity)
+    db.session.flush()
+    promoted = fill_from_waitlist(program_id)
+    db.session.commit()
+    click.echo(f"{program.name}: capacity {program.capacity or 'unlimited'}, "
+               f"promoted {len(promoted)} from the waitlist")
+
+@app.cli.command('recount-seats')
+def recount_seats_command():
+    """Rebuild every program's seat counter from its registrations."""
+    recount_seats()
+    for program in Program.query.all():
+        fill_from_waitlist(program.id)
+    db.session.commit()
+    for program in Program.query.order_by(Program.id).all():
+        click.echo(f"{program.name}: {program.seats_taken} of {program.capacity or 'unlimited'} seats taken")
+
+@app.route('/admin/import', methods=['POST'])
+@admin_required
+def admin_import():
+    try:
+        file = request.files.get('file')
+        if not file or not file.filename:
+            return jsonify({'error': 'No file uploaded'}), 400
+
+        stream = TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+        report = import_registrations(
+            iter_import_records(stream, _import_format(file.filename, request.form.get('format'))),
+            batch_size=max(1, min(int(request.form.get('batch_size', 1000)), 10000)),
+            queue_emails=request.form.get('send_emails') == '1',
+            dry_run=request.form.get('dry_run') == '1'
+        )
+        return jsonify(report)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error importing registrations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/receipt/<int:registration_id>')
 @admin_required
 def download_receipt(registration_id):
@@ -574,24 +3240,867 @@ def download_receipt(registration_id):
             flash('No receipt found for this registration', 'error')
             return redirect(url_for('admin'))
 
-        receipt_path = os.path.join(app.config['UPLOAD_FOLDER'], registration.payment_receipt)
-        if not os.path.exists(receipt_path):
+        path = receipt_path(registration)
+        if not os.path.exists(path):
             flash('Receipt file not found', 'error')
             return redirect(url_for('admin'))
 
-        return send_file(
-            receipt_path,
+        if app.config['RECEIPT_OFFLOAD'] == 'x-accel':
+            # nginx serves the bytes from an internal location mapped to UPLOAD_FOLDER
+            relative = os.path.relpath(path, app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+            response = Response(mimetype=registration.receipt_mime or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = app.config['RECEIPT_ACCEL_PREFIX'].rstrip('/') + '/' + relative
+            response.headers['Content-Disposition'] = f'attachment; filename="{registration.payment_receipt}"'
+            return response
+
+        # send_file answers Range and conditional requests itself; with
+        # USE_X_SENDFILE it hands the file to the front proxy instead
+        response = send_file(
+            path,
+            mimetype=registration.receipt_mime,
             as_attachment=True,
-            download_name=registration.payment_receipt
+            download_name=registration.payment_receipt,
+            conditional=True,
+            etag=registration.receipt_sha256 or True,
+            max_age=86400
         )
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
     except Exception as e:
         print(f"Error downloading receipt: {str(e)}")
         flash('Error downloading receipt', 'error')
         return redirect(url_for('admin'))
 
-# Initialize the database when the app starts
-with app.app_context():
-    init_db()
+class _ZipSink:
+    """Write-only file object that ``zipfile`` streams into.
+
+    It has no ``seek``/``tell``, so zipfile writes data descriptors instead
+    of seeking back, and the generator drains it after every chunk.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """Build a ZIP archive incrementally and yield it in chunks.
+
+    ``entries`` yields ``(arcname, source)`` where source is a file path or
+    bytes. Nothing is written to a temp file and at most one chunk of each
+    member is held in memory. Pass ``zipfile.ZIP_STORED`` for members that
+    are already compressed.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode='w', compression=compression, compresslevel=1) as archive:
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                info.compress_type = compression
+                with archive.open(info, mode='w', force_zip64=True) as dest:
+                    dest.write(source)
+            else:
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime(os.path.getmtime(source))[:6])
+                info.compress_type = compression
+                with archive.open(info, mode='w', force_zip64=True) as dest, open(source, 'rb') as f:
+                    for chunk in iter(lambda: f.read(RECEIPT_CHUNK_SIZE), b''):
+                        dest.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+def iter_receipt_entries(clauses):
+    """ZIP entries for every stored receipt matching ``clauses``."""
+    query = db.select(Registration.id, Registration.payment_receipt,
+                      Registration.receipt_sha256, Registration.receipt_mime)\
+        .where(Registration.payment_receipt.isnot(None), *clauses)\
+        .order_by(Registration.id)\
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    missing = []
+    for reg_id, filename, sha256, mime in db.session.execute(query):
+        row = Registration(id=reg_id, payment_receipt=filename, receipt_sha256=sha256, receipt_mime=mime)
+        path = receipt_path(row)
+        if os.path.exists(path):
+            yield f"{reg_id}_{secure_filename(filename) or 'receipt'}", path
+        else:
+            missing.append(reg_id)
+    if missing:
+        yield 'MISSING.txt', ('Receipt files not found for registrations: '
+                              + ', '.join(str(i) for i in missing) + '\n').encode('utf-8')
+
+@app.route('/admin/receipts.zip')
+@admin_required
+def download_receipts_zip():
+    try:
+        clauses = registration_filters(request.args)
+        return Response(
+            stream_with_context(stream_zip(iter_receipt_entries(clauses))),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=receipts.zip'}
+        )
+    except Exception as e:
+        print(f"Error downloading receipts: {str(e)}")
+        flash('Error downloading receipts', 'error')
+        return redirect(url_for('admin'))
+
+def ticket_pdf_renderer():
+    """The wkhtmltopdf executable for PDF tickets, or None to use Pillow."""
+    setting = app.config['TICKET_PDF_RENDERER']
+    if setting == 'pillow':
+        return None
+    return ticket_assets.find_wkhtmltopdf(None if setting == 'auto' else setting)
+
+def ticket_data(registration, program, with_html=False):
+    """Everything a worker process needs to render one ticket, as a dict."""
+    ticket = {
+        'id': registration.id,
+        'name': registration.name,
+        'email': registration.email,
+        'organization': registration.organization,
+        'program': program.name,
+        'location': program.location,
+        'date': registration.created_at.strftime('%B %d, %Y') if registration.created_at else '',
+        'payload': ticket_qr_payload(registration.id, registration.name, program.name),
+    }
+    if with_html:
+        ticket['html'] = render_template('ticket_email.html', registration=registration,
+                                         qr_code=ticket_assets.TICKET_QR_PLACEHOLDER)
+    return ticket
+
+def iter_program_tickets(program, clauses):
+    with_html = ticket_pdf_renderer() is not None
+    query = Registration.query.filter(Registration.program_id == program.id, *clauses)\
+        .order_by(Registration.id)\
+        .yield_per(EXPORT_CHUNK_ROWS)
+    for registration in query:
+        yield ticket_data(registration, program, with_html)
+
+# Each process keeps one PDF rendering pool, started on first use, so
+# ticket downloads do not each spawn (and import) a fresh set of processes
+_ticket_pdf_pool = {}
+_ticket_pdf_pool_lock = threading.Lock()
+
+def ticket_pdf_executor(processes):
+    """A process pool for PDF tickets.
+
+    Spawned rather than forked because forking a threaded web worker can copy
+    locks that other threads hold.
+    """
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+def ticket_pdf_pool():
+    """This process' shared PDF rendering pool."""
+    with _ticket_pdf_pool_lock:
+        if 'executor' not in _ticket_pdf_pool:
+            _ticket_pdf_pool['executor'] = ticket_pdf_executor(app.config['TICKET_PDF_WORKERS'])
+        return _ticket_pdf_pool['executor']
+
+def shutdown_ticket_pdf_pool(executor=None):
+    """Stop the shared pool (or drop it, if it is ``executor`` and has broken)."""
+    with _ticket_pdf_pool_lock:
+        if executor is not None and _ticket_pdf_pool.get('executor') is not executor:
+            return
+        executor = _ticket_pdf_pool.pop('executor', None)
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+
+atexit.register(shutdown_ticket_pdf_pool)
+
+def iter_ticket_pdfs(tickets, processes=None):
+    """Render ``tickets`` in a process pool, yielding ``(id, pdf)`` in order.
+
+    Only a few tickets per process are in flight, so the first PDFs stream
+    out while the rest render and memory stays flat. Requests share the
+    process' pool; ``processes`` (the CLI's option) starts one of that size
+    just for this call.
+    """
+    executor = ticket_pdf_executor(processes) if processes else ticket_pdf_pool()
+    window = (processes or app.config['TICKET_PDF_WORKERS']) * 4
+    render = partial(ticket_assets.render_ticket_pdf, app.config['TICKET_CACHE_FOLDER'], ticket_pdf_renderer())
+    pending = deque()
+    try:
+        for ticket in tickets:
+            pending.append(executor.submit(render, ticket))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        # A crashed child breaks the whole pool; the next request starts a new one
+        if not processes:
+            shutdown_ticket_pdf_pool(executor)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+        if processes:
+            executor.shutdown(cancel_futures=True)
+
+def iter_ticket_entries(tickets, processes=None):
+    for reg_id, pdf in iter_ticket_pdfs(tickets, processes):
+        yield f"ticket_{reg_id}.pdf", pdf
+
+def ticket_clauses(args):
+    """Registrations to print tickets for: everyone holding a seat unless
+    ``status`` says otherwise."""
+    clauses = registration_filters({k: v for k, v in args.items() if k != 'program_id'})
+    if not args.get('status'):
+        clauses.append(seat_holding_clause())
+    return clauses
+
+@app.route('/admin/programs/<int:program_id>/tickets.zip')
+@admin_required
+def download_program_tickets(program_id):
+    """Printable PDF tickets for a program, rendered in parallel and streamed as a ZIP."""
+    try:
+        program = db.session.get(Program, program_id)
+        if program is None:
+            abort(404)
+        tickets = iter_program_tickets(program, ticket_clauses(request.args))
+        return Response(
+            # The PDFs' page images are already compressed
+            stream_with_context(stream_zip(iter_ticket_entries(tickets), compression=zipfile.ZIP_STORED)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename=tickets_program_{program_id}.zip'}
+        )
+    except Exception as e:
+        if getattr(e, 'code', None) == 404:
+            raise
+        print(f"Error generating tickets: {str(e)}")
+        flash('Error generating tickets', 'error')
+        return redirect(url_for('admin'))
+
+@app.route('/admin/stats')
+@admin_required
+def admin_stats():
+    """Dashboard numbers, read from the pre-aggregated stats table.
+
+    Optional ``program_id``, ``date_from`` and ``date_to`` narrow the range;
+    ``days`` (default 30) limits the per-day series.
+    """
+    try:
+        clauses = []
+        if request.args.get('program_id'):
+            clauses.append(RegistrationStat.program_id == int(request.args['program_id']))
+        if request.args.get('date_from'):
+            clauses.append(RegistrationStat.day >= _parse_date(request.args['date_from']).date())
+        if request.args.get('date_to'):
+            clauses.append(RegistrationStat.day <= _parse_date(request.args['date_to']).date())
+
+        programs = {p.id: p for p in program_cache.all()}
+        by_program = {}
+        by_status = Counter()
+        fees_collected = 0.0
+        rows = db.session.query(RegistrationStat.program_id, RegistrationStat.status,
+                                db.func.sum(RegistrationStat.count))\
+            .filter(*clauses)\
+            .group_by(RegistrationStat.program_id, RegistrationStat.status)
+        for program_id, status, count in rows:
+            if not count:
+                continue
+            program = programs.get(program_id)
+            entry = by_program.setdefault(program_id, {
+                'program_id': program_id,
+                'name': program.name if program else None,
+                'fee': program.fee if program else None,
+                'total': 0,
+                'by_status': {},
+                'fees_collected': 0.0
+            })
+            entry['total'] += count
+            entry['by_status'][status] = count
+            by_status[status] += count
+            if status in CONFIRMED_STATUSES and program and program.fee:
+                entry['fees_collected'] += count * program.fee
+                fees_collected += count * program.fee
+
+        days = max(1, min(int(request.args.get('days', 30)), 366))
+        day_rows = db.session.query(RegistrationStat.day, db.func.sum(RegistrationStat.count))\
+            .filter(*clauses)\
+            .group_by(RegistrationStat.day)\
+            .order_by(RegistrationStat.day.desc())\
+            .limit(days)\
+            .all()
+
+        return jsonify({
+            'total': sum(by_status.values()),
+            'by_status': dict(by_status),
+            'by_program': sorted(by_program.values(), key=lambda entry: entry['program_id']),
+            'by_day': [{'day': day.isoformat(), 'count': count} for day, count in reversed(day_rows) if count],
+            'fees_collected': fees_collected,
+            'confirmed_statuses': list(CONFIRMED_STATUSES)
+        })
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+    except Exception as e:
+        print(f"Error in admin stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the dashboard statistics from the registrations table."""
+    started = time.monotonic()
+    rebuild_stats()
+    db.session.commit()
+    click.echo(f"Rebuilt {RegistrationStat.query.count()} statistics rows in {time.monotonic() - started:.1f}s")
+
+@app.cli.command('create-email-index')
+def create_email_index_command():
+    """Create the unique email index, listing duplicates that block it."""
+    with db.engine.begin() as connection:
+        created = create_email_unique_index(connection)
+    if created:
+        # Records migration 7 if it was waiting for this index
+        with startup_lock():
+            run_migrations()
+        click.echo("Unique (program, email) index is in place")
+        return
+    duplicates = db.session.query(
+        Registration.program_id, db.func.lower(Registration.email), db.func.count(Registration.id)
+    ).filter(email_unique_filter())\
+        .group_by(Registration.program_id, db.func.lower(Registration.email))\
+        .having(db.func.count(Registration.id) > 1).all()
+    click.echo(f"{len(duplicates)} duplicate (program, email) pairs must be resolved first:")
+    for program_id, email, count in duplicates:
+        click.echo(f"  program {program_id}: {email} ({count} registrations)")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Create the full-text search index if needed and refill it."""
+    started = time.monotonic()
+    with db.engine.begin() as connection:
+        created = create_search_index(connection)
+    if created and search_backend():
+        click.echo(f"Rebuilt the {search_backend()} search index in {time.monotonic() - started:.1f}s")
+    else:
+        click.echo("No search index available; search uses LIKE matching")
+
+@app.route('/tickets/<int:registration_id>/qr.png')
+def ticket_qr(registration_id):
+    try:
+        registration = db.session.get(Registration, registration_id)
+        if not session.get('admin_logged_in'):
+            try:
+                token = _ticket_serializer().loads(request.args.get('token', ''))
+            except BadSignature:
+                token = None
+            if registration is None or token != ticket_token_payload(registration):
+                return jsonify({'error': 'Not authorized'}), 403
+        if registration is None:
+            abort(404)
+        payload = ticket_qr_payload(registration.id, registration.name, registration.program.name)
+        key = ticket_assets.qr_cache_key(payload)
+
+        # The key is the content address, so a matching ETag means the client
+        # already has these exact bytes and we can skip the cache entirely.
+        if request.if_none_match.contains(key):
+            response = Response(status=304)
+        else:
+            key, png = get_ticket_qr(registration)
+            response = Response(png, mimetype='image/png')
+        response.set_etag(key)
+        response.cache_control.private = True
+        response.cache_control.max_age = 86400
+        return response
+    except Exception as e:
+        if getattr(e, 'code', None) == 404:
+            raise
+        print(f"Error serving ticket QR: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.cli.command('prerender-tickets')
+@click.option('--program-id', type=int, help='Only render tickets for this program.')
+@click.option('--processes', type=int, default=None, help='Worker processes (defaults to CPU count).')
+def prerender_tickets_command(program_id, processes):
+    """Fill the ticket QR cache ahead of an event."""
+    started = time.monotonic()
+    query = db.session.query(Registration.id, Registration.name, Program.name)\
+        .join(Program, Registration.program_id == Program.id)
+    if program_id is not None:
+        query = query.filter(Registration.program_id == program_id)
+
+    cache_dir = app.config['TICKET_CACHE_FOLDER']
+    payloads = []
+    for reg_id, name, program_name in query.yield_per(1000):
+        payload = ticket_qr_payload(reg_id, name, program_name)
+        key = ticket_assets.qr_cache_key(payload)
+        if not os.path.exists(ticket_assets.qr_cache_path(cache_dir, key)):
+            payloads.append(payload)
+
+    if payloads:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for _ in executor.map(partial(ticket_assets.ensure_qr_cached, cache_dir), payloads, chunksize=64):
+                pass
+
+    click.echo(f"Rendered {len(payloads)} ticket QR codes in {time.monotonic() - started:.1f}s")
+
+@app.cli.command('render-tickets')
+@click.argument('program_id', type=int)
+@click.option('--output', type=click.Path(dir_okay=False), help='ZIP file to write (default tickets_program_<id>.zip).')
+@click.option('--status', help='Only registrations with this status (default: everyone holding a seat).')
+@click.option('--processes', type=int, default=None, help='Worker processes (defaults to TICKET_PDF_WORKERS).')
+def render_tickets_command(program_id, output, status, processes):
+    """Render printable PDF tickets for a program into a ZIP file."""
+    program = db.session.get(Program, program_id)
+    if program is None:
+        raise click.ClickException(f"Program {program_id} not found")
+    output = output or f"tickets_program_{program_id}.zip"
+    started = time.monotonic()
+    count = 0
+
+    def counted(entries):
+        nonlocal count
+        for entry in entries:
+            count += 1
+            yield entry
+
+    tickets = iter_program_tickets(program, ticket_clauses({'status': status} if status else {}))
+    with open(output, 'wb') as f:
+        for chunk in stream_zip(counted(iter_ticket_entries(tickets, processes)), compression=zipfile.ZIP_STORED):
+            f.write(chunk)
+    renderer = 'wkhtmltopdf' if ticket_pdf_renderer() else 'Pillow'
+    click.echo(f"Rendered {count} tickets with {renderer} into {output} in {time.monotonic() - started:.1f}s")
+
+# Broadcasts. The subject and body are admin-written Jinja templates, so
+# they are compiled once per run in a sandbox and rendered per recipient.
+broadcast_body_environment = SandboxedEnvironment(autoescape=True)
+broadcast_subject_environment = SandboxedEnvironment(autoescape=False)
+BROADCAST_CLAIMABLE_STATUSES = ('pending', 'sending', 'interrupted')
+
+class BroadcastStopped(Exception):
+    """The broadcast was cancelled or claimed by another run."""
+
+def compile_broadcast(subject, body):
+    """Compile a broadcast's templates; raises TemplateSyntaxError."""
+    return (broadcast_subject_environment.from_string(subject),
+            broadcast_body_environment.from_string(body))
+
+def broadcast_context(row, program):
+    registration = {
+        'id': row.id,
+        'name': row.name,
+        'email': row.email,
+        'organization': row.organization,
+        'designation': row.designation,
+        'status': row.status,
+    }
+    return {'registration': registration, 'program': program, 'name': row.name}
+
+def broadcast_recipient_clauses(broadcast):
+    clauses = [Registration.program_id == broadcast.program_id]
+    if broadcast.recipient_status:
+        clauses.append(Registration.status == broadcast.recipient_status)
+    else:
+        clauses.append(seat_holding_clause())
+    return clauses
+
+def claim_broadcast(broadcast_id):
+    """Claim a broadcast for this run; returns a token, or None if it is finished
+    or another live run holds it."""
+    now = datetime.utcnow()
+    token = secrets.token_hex(16)
+    stale = now - timedelta(seconds=app.config['BROADCAST_CLAIM_TIMEOUT_SECONDS'])
+    claimed = Broadcast.query\
+        .filter(Broadcast.id == broadcast_id,
+                Broadcast.status.in_(BROADCAST_CLAIMABLE_STATUSES),
+                db.or_(Broadcast.claim_token.is_(None), Broadcast.claimed_at < stale))\
+        .update({'status': 'sending', 'claim_token': token, 'claimed_at': now,
+                 'started_at': db.func.coalesce(Broadcast.started_at, now)},
+                synchronize_session=False)
+    db.session.commit()
+    return token if claimed else None
+
+def _checkpoint_broadcast(broadcast_id, token, values):
+    """Record progress while still holding the claim."""
+    updated = Broadcast.query\
+        .filter(Broadcast.id == broadcast_id, Broadcast.claim_token == token,
+                Broadcast.status == 'sending')\
+        .update(dict(values, claimed_at=datetime.utcnow()), synchronize_session=False)
+    db.session.commit()
+    if not updated:
+        raise BroadcastStopped()
+
+def run_broadcast(broadcast_id):
+    """Send a broadcast from its checkpoint to the last recipient.
+
+    Messages go out in batches of BROADCAST_BATCH_SIZE over one SMTP
+    connection each, paced to BROADCAST_RATE_PER_MINUTE. Returns False if
+    the broadcast could not be claimed.
+    """
+    token = claim_broadcast(broadcast_id)
+    if token is None:
+        return False
+    broadcast = db.session.get(Broadcast, broadcast_id)
+    program = ProgramSnapshot(broadcast.program.id, broadcast.program.name, broadcast.program.description,
+                              broadcast.program.location, broadcast.program.fee)
+    subject_template, body_template = compile_broadcast(broadcast.subject, broadcast.body)
+    clauses = broadcast_recipient_clauses(broadcast)
+    last_id = broadcast.last_registration_id
+    rate = app.config['BROADCAST_RATE_PER_MINUTE']
+    interval = 60.0 / rate if rate > 0 else 0.0
+    next_send = time.monotonic()
+    db.session.commit()
+
+    try:
+        while True:
+            # Plain rows, so the per-message commits do not expire them
+            recipients = db.session.query(
+                Registration.id, Registration.name, Registration.email, Registration.organization,
+                Registration.designation, Registration.status
+            ).filter(Registration.id > last_id, *clauses)\
+                .order_by(Registration.id)\
+                .limit(app.config['BROADCAST_BATCH_SIZE'])\
+                .all()
+            if not recipients:
+                break
+
+            connection = None
+            try:
+                for row in recipients:
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_send = max(next_send, time.monotonic()) + interval
+
+                    context = broadcast_context(row, program)
+                    msg = Message(subject_template.render(context), recipients=[row.email],
+                                  html=body_template.render(context))
+                    try:
+                        if connection is None:
+                            connection = open_smtp_connection()
+                        with app_metrics.timer('smtp_send_seconds'):
+                            connection.send(msg)
+                        progress = {'sent_count': Broadcast.sent_count + 1}
+                    except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError):
+                        # Lost the connection: stop here so a resume retries this recipient
+                        app_metrics.inc('smtp_send_failures_total')
+                        raise
+                    except Exception as e:
+                        print(f"Error sending broadcast {broadcast_id} to {row.email}: {str(e)}")
+                        app_metrics.inc('smtp_send_failures_total')
+                        progress = {'failed_count': Broadcast.failed_count + 1,
+                                    'last_error': f"{row.email}: {str(e)}"}
+                    last_id = row.id
+                    _checkpoint_broadcast(broadcast_id, token, dict(progress, last_registration_id=last_id))
+            finally:
+                if connection is not None:
+                    close_smtp_connection(connection)
+
+        _checkpoint_broadcast(broadcast_id, token, {'status': 'completed', 'claim_token': None,
+                                                    'completed_at': datetime.utcnow()})
+    except BroadcastStopped:
+        db.session.rollback()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Broadcast {broadcast_id} interrupted: {str(e)}")
+        Broadcast.query.filter_by(id=broadcast_id, claim_token=token)\
+            .update({'status': 'interrupted', 'claim_token': None, 'last_error': str(e)},
+                    synchronize_session=False)
+        db.session.commit()
+    return True
+
+def start_broadcast(broadcast_id):
+    """Run a broadcast on a background thread of this process."""
+    def run():
+        with app.app_context():
+            try:
+                run_broadcast(broadcast_id)
+            except Exception as e:
+                print(f"Error running broadcast {broadcast_id}: {str(e)}")
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name=f'broadcast-{broadcast_id}', daemon=True).start()
+
+def broadcast_summary(broadcast):
+    remaining = db.session.query(db.func.count(Registration.id))\
+        .filter(Registration.id > broadcast.last_registration_id, *broadcast_recipient_clauses(broadcast))\
+        .scalar()
+    return {
+        'id': broadcast.id,
+        'program_id': broadcast.program_id,
+        'subject': broadcast.subject,
+        'recipient_status': broadcast.recipient_status,
+        'status': broadcast.status,
+        'sent': broadcast.sent_count,
+        'failed': broadcast.failed_count,
+        'remaining': remaining if broadcast.status not in ('completed', 'cancelled') else 0,
+        'last_registration_id': broadcast.last_registration_id,
+        'last_error': broadcast.last_error,
+        'created_at': broadcast.created_at.isoformat() if broadcast.created_at else None,
+        'started_at': broadcast.started_at.isoformat() if broadcast.started_at else None,
+        'completed_at': broadcast.completed_at.isoformat() if broadcast.completed_at else None,
+    }
+
+def create_broadcast(program_id, subject, body, recipient_status=None):
+    """Validate and store a new broadcast; raises ValueError on bad input."""
+    if not (subject or '').strip() or not (body or '').strip():
+        raise ValueError('Subject and body are required')
+    try:
+        compile_broadcast(subject, body)
+    except TemplateSyntaxError as e:
+        raise ValueError(f'Template error on line {e.lineno}: {e.message}')
+    broadcast = Broadcast(program_id=program_id, subject=subject.strip(), body=body,
+                          recipient_status=recipient_status or None)
+    db.session.add(broadcast)
+    db.session.commit()
+    return broadcast
+
+@app.route('/admin/programs/<int:program_id>/broadcasts', methods=['POST'])
+@admin_required
+def create_program_broadcast(program_id):
+    """Queue an email to a program's registrants and start sending it.
+
+    Takes JSON or form fields ``subject`` and ``body`` (Jinja templates with
+    ``registration``, ``program`` and ``name`` in scope) and an optional
+    ``status`` to pick recipients (default: everyone holding a seat).
+    """
+    try:
+        if db.session.get(Program, program_id) is None:
+            return jsonify({'error': 'Program not found'}), 404
+        data = request.get_json(silent=True) or request.form
+        broadcast = create_broadcast(program_id, data.get('subject'), data.get('body'), data.get('status'))
+        start_broadcast(broadcast.id)
+        return jsonify(broadcast_summary(broadcast)), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating broadcast: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/broadcasts/<int:broadcast_id>')
+@admin_required
+def get_broadcast(broadcast_id):
+    broadcast = db.session.get(Broadcast, broadcast_id)
+    if broadcast is None:
+        return jsonify({'error': 'Broadcast not found'}), 404
+    return jsonify(broadcast_summary(broadcast))
+
+@app.route('/admin/broadcasts/<int:broadcast_id>/resume', methods=['POST'])
+@admin_required
+def resume_broadcast(broadcast_id):
+    broadcast = db.session.get(Broadcast, broadcast_id)
+    if broadcast is None:
+        return jsonify({'error': 'Broadcast not found'}), 404
+    if broadcast.status not in BROADCAST_CLAIMABLE_STATUSES:
+        return jsonify({'error': f'Broadcast is {broadcast.status}'}), 409
+    start_broadcast(broadcast_id)
+    return jsonify(broadcast_summary(broadcast)), 202
+
+@app.route('/admin/broadcasts/<int:broadcast_id>/cancel', methods=['POST'])
+@admin_required
+def cancel_broadcast(broadcast_id):
+    try:
+        cancelled = Broadcast.query\
+            .filter(Broadcast.id == broadcast_id, Broadcast.status.in_(BROADCAST_CLAIMABLE_STATUSES))\
+            .update({'status': 'cancelled', 'claim_token': None}, synchronize_session=False)
+        db.session.commit()
+        broadcast = db.session.get(Broadcast, broadcast_id)
+        if broadcast is None:
+            return jsonify({'error': 'Broadcast not found'}), 404
+        if not cancelled:
+            return jsonify({'error': f'Broadcast is {broadcast.status}'}), 409
+        return jsonify(broadcast_summary(broadcast))
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error cancelling broadcast: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.cli.command('send-broadcast')
+@click.argument('program_id', type=int)
+@click.option('--subject', required=True, help='Subject line (Jinja template).')
+@click.option('--body-file', type=click.File('r'), required=True, help='HTML body (Jinja template).')
+@click.option('--status', help='Only registrations with this status (default: everyone holding a seat).')
+def send_broadcast_command(program_id, subject, body_file, status):
+    """Email a program's registrants, in the foreground."""
+    if db.session.get(Program, program_id) is None:
+        raise click.ClickException(f"Program {program_id} not found")
+    try:
+        broadcast = create_broadcast(program_id, subject, body_file.read(), status)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Created broadcast {broadcast.id}")
+    run_broadcast(broadcast.id)
+    summary = broadcast_summary(db.session.get(Broadcast, broadcast.id))
+    click.echo(f"Broadcast {broadcast.id} {summary['status']}: {summary['sent']} sent, {summary['failed']} failed")
+
+@app.cli.command('resume-broadcasts')
+@click.option('--id', 'broadcast_id', type=int, help='Resume only this broadcast.')
+def resume_broadcasts_command(broadcast_id):
+    """Finish interrupted broadcasts from their last checkpoint."""
+    query = db.session.query(Broadcast.id).filter(Broadcast.status.in_(BROADCAST_CLAIMABLE_STATUSES))
+    if broadcast_id is not None:
+        query = query.filter(Broadcast.id == broadcast_id)
+    for (pending_id,) in query.order_by(Broadcast.id).all():
+        if not run_broadcast(pending_id):
+            click.echo(f"Broadcast {pending_id} is being sent by another process")
+            continue
+        summary = broadcast_summary(db.session.get(Broadcast, pending_id))
+        click.echo(f"Broadcast {pending_id} {summary['status']}: {summary['sent']} sent, {summary['failed']} failed")
+
+# Archival. Registrations of finished programs (or older than a cutoff) are
+# moved to registration_archive in batches, each batch copied and deleted in
+# one transaction, so the move can be stopped and rerun at any point. The
+# hot table and its indexes then only hold current cohorts. Stats and seat
+# counts still include archived rows.
+ARCHIVE_COLUMNS = [column.name for column in RegistrationArchive.__table__.columns if column.name != 'archived_at']
+
+def archive_clauses(program_ids=None, before=None):
+    """Clauses selecting the registrations to archive."""
+    clauses = []
+    if program_ids:
+        clauses.append(Registration.program_id.in_(program_ids))
+    if before is not None:
+        clauses.append(Registration.created_at < before)
+    # Emails still waiting to go out keep their registration in place
+    clauses.append(~db.exists().where(EmailOutbox.registration_id == Registration.id,
+                                      EmailOutbox.status.in_(('queued', 'sending'))))
+    return clauses
+
+def archive_batch(clauses, batch_size):
+    """Move up to ``batch_size`` matching registrations to the archive.
+
+    Returns the number moved; 0 means there is nothing left to move.
+    """
+    ids = db.session.execute(
+        db.select(Registration.id).where(*clauses).order_by(Registration.id).limit(batch_size).with_for_update()
+    ).scalars().all()
+    if not ids:
+        return 0
+    try:
+        db.session.execute(
+            db.insert(RegistrationArchive).from_select(
+                ARCHIVE_COLUMNS + ['archived_at'],
+                db.select(*[Registration.__table__.c[name] for name in ARCHIVE_COLUMNS],
+                          db.literal(datetime.utcnow(), db.DateTime))
+                .where(Registration.id.in_(ids))
+            )
+        )
+        detach_outbox_entries(ids)
+        # A plain DELETE: no mapper events, so stats and seats stay as they are
+        db.session.execute(
+            db.delete(Registration).where(Registration.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        record_tombstones(db.session.connection(), ids, reason='archived')
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(ids)
+
+# Archived rows for the query API: the bulk fields plus when they were archived
+ARCHIVE_FIELDS = {
+    name: Program.name if name == 'program_name' else getattr(RegistrationArchive, name)
+    for name in BULK_FIELDS
+}
+ARCHIVE_FIELDS['archived_at'] = RegistrationArchive.archived_at
+ARCHIVE_DEFAULT_FIELDS = BULK_DEFAULT_FIELDS + ['archived_at']
+
+ARCHIVE_EXPORT_COLUMNS = [
+    (header, getattr(RegistrationArchive, column.key) if column.class_ is Registration else column)
+    for header, column in ADMIN_EXPORT_COLUMNS
+] + [('Archived Date', RegistrationArchive.archived_at)]
+
+@app.route('/api/archive/registrations')
+@admin_required
+def archived_registrations():
+    """Stream archived registrations.
+
+    Takes ``ids`` (comma-separated) or the listing filters, and ``fields``
+    and ``format`` as for ``/api/registrations/bulk``. Without either, the
+    whole archive is streamed.
+    """
+    try:
+        args = request.args
+        fields = _split_list(args.get('fields') or ARCHIVE_DEFAULT_FIELDS)
+        unknown = [name for name in fields if name not in ARCHIVE_FIELDS]
+        if not fields or unknown:
+            return jsonify({'error': f"fields must only contain {', '.join(ARCHIVE_FIELDS)}"}), 400
+        fmt = args.get('format') or 'ndjson'
+        if fmt not in ('ndjson', 'json'):
+            return jsonify({'error': "format must be 'ndjson' or 'json'"}), 400
+        clauses = registration_filters(args, RegistrationArchive)
+        if args.get('ids'):
+            clauses.append(RegistrationArchive.id.in_([int(i) for i in _split_list(args['ids'])]))
+        if args.get('email'):
+            clauses.append(db.func.lower(RegistrationArchive.email) == args['email'].strip().lower())
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+
+    try:
+        query = db.select(*[ARCHIVE_FIELDS[name] for name in fields]).select_from(RegistrationArchive)
+        if 'program_name' in fields:
+            query = query.join(Program, RegistrationArchive.program_id == Program.id)
+        query = query.where(*clauses)\
+            .order_by(RegistrationArchive.id)\
+            .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        rows = (row for partition in db.session.execute(query).partitions() for row in partition)
+        return Response(
+            stream_with_context(generate_bulk_rows(fields, rows, fmt)),
+            mimetype='application/json' if fmt == 'json' else 'application/x-ndjson'
+        )
+    except Exception as e:
+        print(f"Error reading archived registrations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/archive/export')
+@admin_required
+def export_archived_registrations():
+    try:
+        return csv_export_response(ARCHIVE_EXPORT_COLUMNS, registration_filters(request.args, RegistrationArchive),
+                                   'archived-registrations.csv', RegistrationArchive)
+    except Exception as e:
+        print(f"Error exporting archived registrations: {str(e)}")
+        flash('Error exporting archived registrations', 'error')
+        return redirect(url_for('admin'))
+
+@app.cli.command('archive-registrations')
+@click.option('--program-id', 'program_ids', type=int, multiple=True,
+              help='Archive this finished program\'s registrations (repeatable).')
+@click.option('--before', help='Archive registrations created before this date (YYYY-MM-DD).')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+@click.option('--pause', type=float, default=0.0, help='Seconds to wait between batches.')
+def archive_registrations_command(program_ids, before, batch_size, pause):
+    """Move registrations to the archive table in resumable batches."""
+    if not program_ids and not before:
+        raise click.ClickException('Give --program-id and/or --before')
+    for program_id in program_ids:
+        if db.session.get(Program, program_id) is None:
+            raise click.ClickException(f"Program {program_id} not found")
+    try:
+        cutoff = _parse_date(before) if before else None
+    except ValueError:
+        raise click.ClickException(f"Invalid date: {before}")
+    clauses = archive_clauses(program_ids, cutoff)
+    started = time.monotonic()
+    total = 0
+    while True:
+        moved = archive_batch(clauses, batch_size)
+        if not moved:
+            break
+        total += moved
+        click.echo(f"Archived {total} registrations")
+        if pause:
+            time.sleep(pause)
+    click.echo(f"Archived {total} registrations in {time.monotonic() - started:.1f}s")
+
+# Bring the database up to date when the app is imported. With gunicorn's
+# preload_app this runs once in the master before workers are forked.
+if env_bool('AUTO_MIGRATE', True):
+    with app.app_context():
+        init_db()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
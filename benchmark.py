@@ -0,0 +1,551 @@
+"""Benchmark the hot routes against synthetic registrations.
+
+Seeds a temporary SQLite database per dataset size, then drives the real app
+both in-process (Flask test client) and through gunicorn on localhost. Email
+sending is suppressed, so SMTP is never contacted. Results are written as
+JSON and can be checked against absolute thresholds and a previous run.
+
+    python benchmark.py                                  # 10k, 100k, 1M rows; both modes
+    python benchmark.py --sizes 10000 --modes inprocess --requests 100
+    python benchmark.py --check benchmark_thresholds.json --baseline last.json
+
+Seeded databases are kept under --workdir (if given) and reused by later runs.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = '10000,100000,1000000'
+ADMIN_PASSWORD = 'benchmark'
+SEED_BATCH_ROWS = 10000
+RECEIPT_EVERY = 10  # every 10th seeded registration has a receipt
+
+# name -> (share of --requests, whether it needs an admin session). Exports
+# stream the whole table, so they run far fewer requests.
+SCENARIOS = {
+    'admin_page': (1.0, True),
+    'registration_get': (1.0, True),
+    'receipt_download': (1.0, True),
+    'export_legacy': (0.02, True),
+    'export_admin': (0.02, True),
+    'register_post': (1.0, False),
+}
+
+
+def app_environment(workdir):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'registrations.db')}",
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'TICKET_CACHE_FOLDER': os.path.join(workdir, 'tickets'),
+        'METRICS_FOLDER': os.path.join(workdir, 'metrics'),
+        'RATE_LIMIT_DATABASE': os.path.join(workdir, 'ratelimit.db'),
+        # Every simulated client shares one IP, so rate limits would
+        # measure 429s instead of the routes
+        'ADMISSION_CONTROL': 'false',
+        'MAIL_SUPPRESS_SEND': 'true',
+        'MAIL_DEFAULT_SENDER': 'benchmark@example.com',
+        'SECRET_KEY': 'benchmark',
+        'ADMIN_PASSWORD': ADMIN_PASSWORD,
+        'PYTHONPATH': ROOT,
+    })
+    return env
+
+
+def receipt_png():
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.effect_noise((320, 320), 48).convert('RGB').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# --- roles run in child processes, so each gets a fresh app configuration ---
+
+def seed(rows):
+    """Fill the database configured in the environment with ``rows`` registrations."""
+    import hashlib
+
+    from app import app, db, Program, Registration, receipt_storage_path, rebuild_stats, recount_seats
+
+    rng = random.Random(rows)
+    png = receipt_png()
+    sha256 = hashlib.sha256(png).hexdigest()
+    statuses = ['pending'] * 6 + ['approved'] * 2 + ['confirmed', 'rejected']
+    started = time.monotonic()
+    with app.app_context():
+        path = receipt_storage_path(sha256, 'image/png')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(png)
+
+        program_ids = [p.id for p in Program.query.all()]
+        now = datetime.utcnow()
+        table = Registration.__table__
+        for offset in range(0, rows, SEED_BATCH_ROWS):
+            batch = []
+            for i in range(offset, min(offset + SEED_BATCH_ROWS, rows)):
+                has_receipt = i % RECEIPT_EVERY == 0
+                batch.append({
+                    'program_id': program_ids[i % len(program_ids)],
+                    'name': f"Attendee {i}",
+                    'email': f"attendee{i}@example.com",
+                    'phone': f"080{i:08d}",
+                    'organization': f"Organization {rng.randrange(500)}",
+                    'designation': rng.choice(['Engineer', 'Manager', 'Analyst', 'Director']),
+                    'expectations': 'Learn the material',
+                    'created_at': now - timedelta(seconds=rng.randrange(180 * 86400)),
+                    'status': rng.choice(statuses),
+                    'payment_reference': f"REF{i:010d}",
+                    'payment_receipt': 'receipt.png' if has_receipt else None,
+                    'receipt_sha256': sha256 if has_receipt else None,
+                    'receipt_size': len(png) if has_receipt else None,
+                    'receipt_mime': 'image/png' if has_receipt else None,
+                })
+            # Core inserts skip the mapper events, so counters are rebuilt below
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+        rebuild_stats()
+        recount_seats()
+        db.session.commit()
+    return time.monotonic() - started
+
+
+class InProcessTarget:
+    """Sends requests through Flask's test client, one client per thread."""
+
+    def __init__(self):
+        from app import app
+
+        self.app = app
+        self._local = threading.local()
+
+    def _client(self, admin):
+        attr = 'admin' if admin else 'anonymous'
+        client = getattr(self._local, attr, None)
+        if client is None:
+            client = self.app.test_client()
+            if admin:
+                with client.session_transaction() as session:
+                    session['admin_logged_in'] = True
+            setattr(self._local, attr, client)
+        return client
+
+    def send(self, method, path, body=None, headers=None, admin=False):
+        response = self._client(admin).open(path, method=method, data=body, headers=headers or {})
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return response.status_code, size
+
+
+class HttpTarget:
+    """Sends requests to a running server over keep-alive connections."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+        self.admin_cookie = self._login()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=300)
+        return connection
+
+    def _login(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        connection.request('POST', '/admin/login', body=f'username=admin&password={ADMIN_PASSWORD}',
+                           headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = connection.getresponse()
+        response.read()
+        cookie = response.getheader('Set-Cookie', '').split(';', 1)[0]
+        connection.close()
+        if response.status != 302 or not cookie:
+            raise RuntimeError(f"Admin login failed with HTTP {response.status}")
+        return cookie
+
+    def send(self, method, path, body=None, headers=None, admin=False):
+        headers = dict(headers or {})
+        if admin:
+            headers['Cookie'] = self.admin_cookie
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                size = 0
+                for chunk in iter(lambda: response.read(65536), b''):
+                    size += len(chunk)
+                return response.status, size
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; retry once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+class RequestFactory:
+    """Builds the request for each scenario."""
+
+    def __init__(self, rows, program_ids):
+        self.rows = rows
+        self.program_ids = program_ids
+        self.png = receipt_png()
+        self._counter = itertools.count()
+        self._rng = random.Random(42)
+        self._lock = threading.Lock()
+
+    def _randrange(self, n):
+        with self._lock:
+            return self._rng.randrange(n)
+
+    def build(self, scenario):
+        if scenario == 'admin_page':
+            return 'GET', '/admin', None, {}
+        if scenario == 'registration_get':
+            return 'GET', f"/api/registrations/{self._randrange(self.rows) + 1}", None, {}
+        if scenario == 'receipt_download':
+            # Seeded row i has id i + 1, and rows 0, 10, 20... have receipts
+            receipt_rows = (self.rows + RECEIPT_EVERY - 1) // RECEIPT_EVERY
+            return 'GET', f"/admin/receipt/{self._randrange(receipt_rows) * RECEIPT_EVERY + 1}", None, {}
+        if scenario == 'export_legacy':
+            return 'GET', '/export', None, {}
+        if scenario == 'export_admin':
+            return 'GET', '/admin/export', None, {}
+        if scenario == 'register_post':
+            n = next(self._counter)
+            program_id = self.program_ids[n % len(self.program_ids)]
+            fields = {
+                'name': f"Benchmark {n}",
+                'email': f"bench-{uuid.uuid4().hex}@example.com",
+                'phone': '08000000000',
+                'organization': 'Benchmark Ltd',
+                'designation': 'Tester',
+                'expectations': 'Speed',
+                'payment_reference': f"BENCH{n}",
+                'idempotency_key': uuid.uuid4().hex,
+            }
+            body, content_type = multipart_body(fields, 'payment_receipt', 'receipt.png', self.png)
+            return 'POST', f"/register/{program_id}", body, {'Content-Type': content_type}
+        raise ValueError(f"Unknown scenario {scenario}")
+
+
+def multipart_body(fields, file_field, filename, data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(target, factory, scenario, requests, concurrency, warmup):
+    admin = SCENARIOS[scenario][1]
+    # Successful registration POSTs redirect; everything else returns 200
+    expected = 302 if scenario == 'register_post' else 200
+
+    def one(_):
+        method, path, body, headers = factory.build(scenario)
+        started = time.perf_counter()
+        try:
+            status, size = target.send(method, path, body, headers, admin=admin)
+        except Exception as e:
+            return time.perf_counter() - started, False, 0, str(e)
+        return time.perf_counter() - started, status == expected, size, None if status == expected else f"HTTP {status}"
+
+    for i in range(warmup):
+        one(i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(o[0] * 1000 for o in outcomes)
+    errors = [o[3] for o in outcomes if not o[1]]
+    return {
+        'scenario': scenario,
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:5],
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else None,
+        'bytes_per_request': int(statistics.mean(o[2] for o in outcomes)) if outcomes else 0,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 2),
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p90': round(percentile(latencies, 0.90), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2),
+        },
+    }
+
+
+def run_scenarios(target, rows, program_ids, options):
+    factory = RequestFactory(rows, program_ids)
+    results = []
+    for scenario in options['scenarios']:
+        share = SCENARIOS[scenario][0]
+        requests = max(2, int(options['requests'] * share))
+        concurrency = max(1, min(options['concurrency'], requests))
+        warmup = min(5, requests // 10)
+        result = run_scenario(target, factory, scenario, requests, concurrency, warmup)
+        print(f"    {scenario:18} {result['throughput_rps']:>9} req/s  "
+              f"p50 {result['latency_ms']['p50']:>8} ms  p95 {result['latency_ms']['p95']:>8} ms  "
+              f"errors {result['errors']}", flush=True)
+        results.append(result)
+    return results
+
+
+def program_ids_in(workdir):
+    import sqlite3
+
+    with sqlite3.connect(os.path.join(workdir, 'registrations.db')) as connection:
+        return [row[0] for row in connection.execute('SELECT id FROM program ORDER BY id')]
+
+
+def run_inprocess(workdir, rows, options):
+    target = InProcessTarget()
+    return run_scenarios(target, rows, program_ids_in(workdir), options)
+
+
+# --- orchestration ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def child(role, workdir, extra_args, env):
+    command = [sys.executable, os.path.abspath(__file__), '--role', role, '--workdir', workdir] + extra_args
+    subprocess.run(command, env=env, cwd=ROOT, check=True)
+
+
+def prepare_dataset(base, rows, reuse):
+    workdir = os.path.join(base, f"rows-{rows}")
+    marker = os.path.join(workdir, 'seeded.json')
+    if reuse and os.path.exists(marker):
+        with open(marker) as f:
+            return workdir, json.load(f)['seconds']
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    result_file = os.path.join(workdir, 'seed-result.json')
+    child('seed', workdir, ['--rows', str(rows), '--result-file', result_file], app_environment(workdir))
+    with open(result_file) as f:
+        seconds = json.load(f)['seconds']
+    with open(marker, 'w') as f:
+        json.dump({'rows': rows, 'seconds': seconds}, f)
+    return workdir, seconds
+
+
+def snapshot_database(workdir):
+    """Copy the seeded database so every run starts from the same state."""
+    run_dir = os.path.join(workdir, 'run')
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    for name in ('registrations.db', 'registrations.db-wal', 'registrations.db-shm'):
+        if os.path.exists(os.path.join(workdir, name)):
+            shutil.copy(os.path.join(workdir, name), os.path.join(run_dir, name))
+    shutil.copytree(os.path.join(workdir, 'uploads'), os.path.join(run_dir, 'uploads'))
+    return run_dir
+
+
+def run_gunicorn(run_dir, rows, options):
+    port = free_port()
+    env = app_environment(run_dir)
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn_config.py'),
+               '--bind', f'127.0.0.1:{port}', 'app:app']
+    log = open(os.path.join(run_dir, 'gunicorn.log'), 'wb')
+    server = subprocess.Popen(command, env=env, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                connection.request('GET', '/')
+                connection.getresponse().read()
+                connection.close()
+                break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"gunicorn did not start; see {log.name}")
+                time.sleep(0.2)
+        target = HttpTarget('127.0.0.1', port)
+        return run_scenarios(target, rows, program_ids_in(run_dir), options)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        log.close()
+
+
+def check_results(results, thresholds=None, baseline=None, tolerance=0.2):
+    """Return a list of human-readable threshold and regression failures."""
+    failures = []
+    previous = {}
+    if baseline:
+        previous = {(r['mode'], r['rows'], r['scenario']): r for r in baseline.get('results', [])}
+    for result in results:
+        key = (result['mode'], result['rows'], result['scenario'])
+        label = '/'.join(str(k) for k in key)
+        if thresholds:
+            limits = dict(thresholds.get('default', {}))
+            limits.update(thresholds.get('scenarios', {}).get(result['scenario'], {}))
+            limits.update(thresholds.get('scenarios', {}).get(label, {}))
+            error_rate = result['errors'] / result['requests']
+            if error_rate > limits.get('max_error_rate', 0.0):
+                failures.append(f"{label}: error rate {error_rate:.1%} exceeds {limits.get('max_error_rate', 0.0):.1%}")
+            if 'p95_ms' in limits and result['latency_ms']['p95'] > limits['p95_ms']:
+                failures.append(f"{label}: p95 {result['latency_ms']['p95']} ms exceeds {limits['p95_ms']} ms")
+            if 'min_rps' in limits and result['throughput_rps'] < limits['min_rps']:
+                failures.append(f"{label}: {result['throughput_rps']} req/s is below {limits['min_rps']} req/s")
+        old = previous.get(key)
+        if old:
+            if result['latency_ms']['p95'] > old['latency_ms']['p95'] * (1 + tolerance):
+                failures.append(f"{label}: p95 regressed from {old['latency_ms']['p95']} to "
+                                f"{result['latency_ms']['p95']} ms")
+            if result['throughput_rps'] < old['throughput_rps'] * (1 - tolerance):
+                failures.append(f"{label}: throughput regressed from {old['throughput_rps']} to "
+                                f"{result['throughput_rps']} req/s")
+    return failures
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def orchestrate(args):
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    modes = [mode for mode in args.modes.split(',') if mode]
+    options = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'scenarios': [s for s in args.scenarios.split(',') if s] if args.scenarios else list(SCENARIOS),
+    }
+    unknown = set(options['scenarios']) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    base = args.workdir or tempfile.mkdtemp(prefix='registration-benchmark-')
+    os.makedirs(base, exist_ok=True)
+    report = {
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': {**options, 'sizes': sizes, 'modes': modes},
+        'seed_seconds': {},
+        'results': [],
+    }
+    try:
+        for rows in sizes:
+            print(f"Seeding {rows} registrations...", flush=True)
+            workdir, seconds = prepare_dataset(base, rows, reuse=bool(args.workdir))
+            report['seed_seconds'][str(rows)] = round(seconds, 2)
+            for mode in modes:
+                print(f"  {mode}, {rows} rows", flush=True)
+                run_dir = snapshot_database(workdir)
+                if mode == 'gunicorn':
+                    results = run_gunicorn(run_dir, rows, options)
+                else:
+                    result_file = os.path.join(run_dir, 'results.json')
+                    child('inprocess', run_dir, [
+                        '--rows', str(rows), '--result-file', result_file,
+                        '--requests', str(args.requests), '--concurrency', str(args.concurrency),
+                        '--scenarios', ','.join(options['scenarios']),
+                    ], app_environment(run_dir))
+                    with open(result_file) as f:
+                        results = json.load(f)
+                for result in results:
+                    report['results'].append({'mode': mode, 'rows': rows, **result})
+    finally:
+        if not args.workdir:
+            shutil.rmtree(base, ignore_errors=True)
+
+    thresholds = baseline = None
+    if args.check:
+        with open(args.check) as f:
+            thresholds = json.load(f)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report['failures'] = check_results(report['results'], thresholds, baseline, args.tolerance)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    for failure in report['failures']:
+        print(f"FAIL {failure}")
+    return 1 if report['failures'] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated dataset sizes')
+    parser.add_argument('--modes', default='inprocess,gunicorn', help='inprocess and/or gunicorn')
+    parser.add_argument('--scenarios', help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--workdir', help='keep and reuse seeded databases here')
+    parser.add_argument('--output', default='benchmark-results.json', help='where to write the JSON report')
+    parser.add_argument('--check', help='thresholds JSON file to enforce')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression versus the baseline')
+    parser.add_argument('--role', default='orchestrate', choices=['orchestrate', 'seed', 'inprocess'],
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == 'seed':
+        with open(args.result_file, 'w') as f:
+            json.dump({'seconds': seed(args.rows)}, f)
+        return 0
+    if args.role == 'inprocess':
+        options = {'requests': args.requests, 'concurrency': args.concurrency,
+                   'scenarios': args.scenarios.split(',')}
+        with open(args.result_file, 'w') as f:
+            json.dump(run_inprocess(args.workdir, args.rows, options), f)
+        return 0
+    return orchestrate(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""Build fingerprinted, precompressed static assets.
+
+Copies the files under static/ (uploads excepted) to static/dist under
+content-hashed names and records them in static/dist/manifest.json, which
+the app's ``asset_url`` helper reads. Along the way it:
+
+- re-encodes PNG and JPEG images with Pillow when that makes them smaller;
+- points ``url(...)`` references in CSS at the hashed names;
+- writes ``.gz`` and, when the ``brotli`` package is installed, ``.br``
+  variants of text assets for the /assets/ route to serve as they are;
+- checks the third-party files in static/vendor against the sha256 sums
+  pinned in static/vendor/SHA256SUMS, and fails on any mismatch.
+
+The build never touches the network. ``--vendor`` downloads the files that
+templates ask for with ``asset_url('vendor/<name>', '<CDN url>')`` and are
+not vendored yet, and pins their sums; commit both. Until a file is vendored,
+its pages keep using the CDN.
+
+    python build_assets.py              # build (keeps files of earlier builds)
+    python build_assets.py --vendor     # download missing vendor files and pin them
+    python build_assets.py --clean      # delete files earlier builds left behind
+
+Earlier builds are kept by default so pages cached before a deploy can
+still load their assets.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import sys
+import tempfile
+import urllib.request
+from io import BytesIO
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+TEMPLATES_DIR = os.path.join(ROOT, 'templates')
+DEFAULT_OUTPUT = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+SKIP_DIRS = ('uploads', 'dist')
+VENDOR_CHECKSUMS = 'vendor/SHA256SUMS'
+
+HASH_LENGTH = 12
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.ico')
+# Variants that save less than this are not worth a second file
+MIN_COMPRESSION_RATIO = 0.9
+
+VENDOR_PATTERN = re.compile(r"""asset_url\(\s*['"](vendor/[^'"]+)['"]\s*,\s*['"](https?://[^'"]+)['"]""")
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def vendor_files():
+    """``{'vendor/<name>': url}`` for every vendored file the templates use."""
+    found = {}
+    for directory, _, filenames in os.walk(TEMPLATES_DIR):
+        for filename in filenames:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                found.update(VENDOR_PATTERN.findall(f.read()))
+    return found
+
+
+class VendorError(Exception):
+    """A vendored file is missing, unpinned or does not match its pin."""
+
+
+def static_path(name):
+    return os.path.join(STATIC_DIR, *name.split('/'))
+
+
+def read_checksums():
+    """``{'vendor/<name>': sha256}`` from the pinned sums file."""
+    checksums = {}
+    path = static_path(VENDOR_CHECKSUMS)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    digest, filename = line.split(None, 1)
+                    checksums[f"vendor/{filename.strip()}"] = digest
+    return checksums
+
+
+def write_checksums(checksums):
+    lines = [f"{digest}  {name[len('vendor/'):]}\n" for name, digest in sorted(checksums.items())]
+    write_file(static_path(VENDOR_CHECKSUMS), ''.join(lines).encode('utf-8'))
+
+
+def verify_vendor_files():
+    """Check every vendored file against its pin; report the ones still on a CDN."""
+    checksums = read_checksums()
+    for name, digest in sorted(checksums.items()):
+        if not os.path.exists(static_path(name)):
+            raise VendorError(f"{name} is pinned in {VENDOR_CHECKSUMS} but missing")
+    vendored = [name for name in source_files() if name.startswith('vendor/')]
+    for name in vendored:
+        if name not in checksums:
+            raise VendorError(f"{name} has no sum in {VENDOR_CHECKSUMS}; run --vendor or remove it")
+        with open(static_path(name), 'rb') as f:
+            actual = hashlib.sha256(f.read()).hexdigest()
+        if actual != checksums[name]:
+            raise VendorError(f"{name} does not match its pinned sha256")
+    for name, url in sorted(vendor_files().items()):
+        if name not in checksums:
+            print(f"  {name}: not vendored, pages will use {url}")
+
+
+def download_vendor_files():
+    """Download the vendor files templates use but that are not vendored yet.
+
+    Files with a pin must match it; new files are pinned for review.
+    """
+    checksums = read_checksums()
+    for name, url in sorted(vendor_files().items()):
+        path = static_path(name)
+        if os.path.exists(path):
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                data = response.read()
+        except OSError as e:
+            raise VendorError(f"{name}: download from {url} failed ({e})")
+        digest = hashlib.sha256(data).hexdigest()
+        if checksums.setdefault(name, digest) != digest:
+            raise VendorError(f"{name} from {url} does not match its pinned sha256")
+        write_file(path, data)
+        print(f"  {name}: downloaded {len(data)} bytes, sha256 {digest}")
+    write_checksums(checksums)
+
+
+def source_files():
+    """Logical names (``images/logo.png``) of every file to build, CSS last."""
+    names = []
+    for directory, dirnames, filenames in os.walk(STATIC_DIR):
+        if directory == STATIC_DIR:
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for filename in filenames:
+            name = os.path.relpath(os.path.join(directory, filename), STATIC_DIR).replace(os.sep, '/')
+            if filename.startswith('.') or name == VENDOR_CHECKSUMS:
+                continue
+            names.append(name)
+    # Stylesheets refer to images by name, so their hashes must be known first
+    return sorted(names, key=lambda name: (name.endswith('.css'), name))
+
+
+def optimize_image(data, extension):
+    """Re-encode an image losslessly (or near it, for JPEG), if that is smaller."""
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(data)) as image:
+            buffer = BytesIO()
+            if extension == '.png':
+                image.save(buffer, format='PNG', optimize=True)
+            else:
+                image.save(buffer, format='JPEG', quality=85, optimize=True, progressive=True)
+    except OSError:
+        return data  # not an image Pillow can read; ship it unchanged
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+def rewrite_css_urls(data, name, manifest):
+    """Point relative ``url(...)`` references at their fingerprinted names."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, target = match.groups()
+        path, _, suffix = target.partition('?')
+        resolved = posixpath.normpath(posixpath.join(base, path))
+        if target.startswith(('data:', 'http:', 'https:', '/', '#')) or resolved not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(manifest[resolved], base or '.')
+        return f"url({quote}{relative}{'?' + suffix if suffix else ''}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def hashed_name(name, data):
+    stem, extension = posixpath.splitext(name)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{extension}"
+
+
+def write_file(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compressed_variants(data):
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items()
+            if len(body) < len(data) * MIN_COMPRESSION_RATIO}
+
+
+def build(output):
+    verify_vendor_files()
+    manifest = {}
+    written = set()
+    totals = {'source': 0, 'built': 0}
+    for name in source_files():
+        with open(static_path(name), 'rb') as f:
+            data = f.read()
+        totals['source'] += len(data)
+        extension = posixpath.splitext(name)[1].lower()
+        if extension in ('.png', '.jpg', '.jpeg'):
+            data = optimize_image(data, extension)
+        elif extension == '.css':
+            data = rewrite_css_urls(data, name, manifest)
+
+        target = hashed_name(name, data)
+        manifest[name] = target
+        path = os.path.join(output, *target.split('/'))
+        write_file(path, data)
+        written.add(path)
+        totals['built'] += len(data)
+        if extension in COMPRESSIBLE:
+            for suffix, body in compressed_variants(data).items():
+                write_file(path + suffix, body)
+                written.add(path + suffix)
+
+    write_file(os.path.join(output, MANIFEST_NAME),
+               json.dumps({'files': manifest}, indent=2, sort_keys=True).encode('utf-8'))
+    print(f"Built {len(manifest)} assets into {output} "
+          f"({totals['source']} bytes of sources, {totals['built']} bytes built"
+          f"{'' if brotli else '; install brotli for .br variants'})")
+    return written
+
+
+def clean(output, keep):
+    removed = 0
+    for directory, _, filenames in os.walk(output):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename != MANIFEST_NAME and path not in keep:
+                os.remove(path)
+                removed += 1
+    print(f"Removed {removed} files from earlier builds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='build directory (default static/dist)')
+    parser.add_argument('--vendor', action='store_true', help='download missing vendor files and pin their sums')
+    parser.add_argument('--clean', action='store_true', help='delete files not produced by this build')
+    args = parser.parse_args()
+
+    try:
+        if args.vendor:
+            download_vendor_files()
+        written = build(args.output)
+    except VendorError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.clean:
+        clean(args.output, written)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
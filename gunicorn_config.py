@@ -1,4 +1,33 @@
+import os
+
 bind = "0.0.0.0:10000"
-workers = 2
-threads = 4
+# The app sizes each worker's database pool from GUNICORN_THREADS
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
 timeout = 120
+
+# The deployment sits behind one reverse proxy (Render's), so client
+# addresses come from X-Forwarded-For. Without this every client would share
+# the rate limit buckets of the proxy's address. Set it to 0 when gunicorn
+# faces clients directly.
+os.environ.setdefault("PROXY_FIX_HOPS", "1")
+
+# Import the app (and run its migrations) once in the master, then fork.
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the workers
+    from app import app, app_metrics, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Otherwise every worker would also report what the master recorded at startup
+    app_metrics.clear()
+
+
+def on_starting(server):
+    # Each worker writes its own metrics snapshot; start from a clean slate
+    from app import clear_metrics_snapshots
+
+    clear_metrics_snapshots()
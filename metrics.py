@@ -0,0 +1,160 @@
+"""In-process metrics with Prometheus text output.
+
+Each process records into its own registry and periodically writes a JSON
+snapshot to a shared directory; the ``/metrics`` endpoint merges every
+snapshot, so the numbers cover all gunicorn workers. Like
+``ticket_assets``, this module has no Flask or database imports.
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Registry:
+    """Thread-safe counters and histograms for one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._definitions = {}
+        self._series = {}
+
+    def counter(self, name, help_text):
+        self._definitions[name] = {'type': 'counter', 'help': help_text}
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._definitions[name] = {'type': 'histogram', 'help': help_text, 'buckets': list(buckets)}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = self._definitions[name]['buckets']
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (not cumulative), then sum and count
+                series = self._series[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(buckets)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def clear(self):
+        """Drop every recorded value, keeping the metric definitions."""
+        with self._lock:
+            self._series.clear()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            series = [[name, dict(labels), value if isinstance(value, (int, float)) else list(value)]
+                      for (name, labels), value in self._series.items()]
+        return {'metrics': self._definitions, 'series': series}
+
+    def write_snapshot(self, directory):
+        """Atomically write this process' snapshot to ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as tmp:
+                json.dump(self.snapshot(), tmp)
+            os.replace(tmp_path, os.path.join(directory, f"{os.getpid()}.json"))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def read_snapshots(directory):
+    snapshots = []
+    if not os.path.isdir(directory):
+        return snapshots
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # removed or replaced while we were reading
+    return snapshots
+
+
+def merge_snapshots(snapshots):
+    """Sum the series of several snapshots into one."""
+    definitions = {}
+    merged = {}
+    for snapshot in snapshots:
+        definitions.update(snapshot['metrics'])
+        for name, labels, value in snapshot['series']:
+            key = (name, tuple(sorted(labels.items())))
+            if isinstance(value, list):
+                current = merged.get(key)
+                if current is None or len(current) != len(value):
+                    merged[key] = list(value)
+                else:
+                    merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return definitions, merged
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(definitions, merged):
+    """Render merged series in the Prometheus text exposition format."""
+    lines = []
+    for name in sorted(definitions):
+        definition = definitions[name]
+        lines.append(f"# HELP {name} {definition['help']}")
+        lines.append(f"# TYPE {name} {definition['type']}")
+        for (series_name, labels), value in sorted(merged.items()):
+            if series_name != name:
+                continue
+            if definition['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(definition['buckets'] + [math.inf], value[:-2]):
+                cumulative += count
+                le = labels + (('le', _format_value(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(value[-2]))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+    return '\n'.join(lines) + '\n'
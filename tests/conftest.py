@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The app configures itself and migrates its database on import, so point it
+# at a scratch directory first
+_scratch = tempfile.mkdtemp(prefix='registration-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(_scratch, 'registrations.db')}",
+    'UPLOAD_FOLDER': os.path.join(_scratch, 'uploads'),
+    'TICKET_CACHE_FOLDER': os.path.join(_scratch, 'tickets'),
+    'METRICS_FOLDER': os.path.join(_scratch, 'metrics'),
+    'RATE_LIMIT_DATABASE': os.path.join(_scratch, 'ratelimit.db'),
+    'MAIL_SUPPRESS_SEND': 'true',
+    'MAIL_WORKERS': '0',
+})
+
+
+@pytest.fixture(scope='session')
+def registration_app():
+    import app as registration_app
+    return registration_app
+
+
+@pytest.fixture
+def client(registration_app):
+    return registration_app.app.test_client()
+
+
+@pytest.fixture
+def admin_client(registration_app):
+    client = registration_app.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
@@ -0,0 +1,25 @@
+def test_archived_ids_are_not_handed_out_again(client, admin_client, registration_app):
+    app, db = registration_app.app, registration_app.db
+    Registration = registration_app.Registration
+    for i in range(3):
+        client.post('/register/2', data={'name': f'Past Registrant {i}', 'email': f'past{i}@example.com'})
+    client.post('/register/1', data={'name': 'Last Registrant', 'email': 'last@example.com'})
+
+    with app.app_context():
+        keep = db.session.query(db.func.max(Registration.id)).scalar()
+        # Rows with unsent emails are not archived
+        db.session.execute(db.update(registration_app.EmailOutbox).values(status='sent'))
+        db.session.commit()
+        clauses = registration_app.archive_clauses() + [Registration.id != keep]
+        while registration_app.archive_batch(clauses, 100):
+            pass
+        archived = db.session.query(db.func.max(registration_app.RegistrationArchive.id)).scalar()
+    assert archived is not None
+
+    assert admin_client.delete(f'/api/registrations/{keep}').status_code == 204
+    client.post('/register/1', data={'name': 'New Registrant', 'email': 'new@example.com'})
+
+    with app.app_context():
+        new_id = Registration.query.filter_by(email='new@example.com').one().id
+    assert new_id > max(archived, keep)
+    assert admin_client.get(f'/api/registrations/{new_id}').get_json()['email'] == 'new@example.com'
@@ -0,0 +1,34 @@
+import pytest
+
+
+def registrations(registration_app, email):
+    Registration = registration_app.Registration
+    with registration_app.app.app_context():
+        return [(r.id, r.status) for r in Registration.query.filter(
+            registration_app.db.func.lower(Registration.email) == email.lower()
+        ).order_by(Registration.id)]
+
+
+def register(client, email, program_id=1):
+    return client.post(f'/register/{program_id}', data={'name': 'Test Registrant', 'email': email})
+
+
+def test_same_email_registers_once_per_program(client, registration_app):
+    register(client, 'twice@example.com')
+    register(client, 'TWICE@example.com')
+    assert len(registrations(registration_app, 'twice@example.com')) == 1
+
+
+@pytest.mark.parametrize('status', ['cancelled', 'rejected'])
+def test_closed_registration_does_not_block_a_new_one(client, admin_client, registration_app, status):
+    email = f'again-{status}@example.com'
+    register(client, email)
+    [(first_id, _)] = registrations(registration_app, email)
+    assert admin_client.put(f'/api/registrations/{first_id}', json={'status': status}).status_code == 200
+
+    register(client, email)
+    assert [s for _, s in registrations(registration_app, email)] == [status, 'pending']
+
+    # Reopening the old one would leave two active registrations
+    response = admin_client.put(f'/api/registrations/{first_id}', json={'status': 'pending'})
+    assert response.status_code == 409
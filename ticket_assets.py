@@ -0,0 +1,181 @@
+"""QR and PDF ticket rendering and the content-addressed disk cache behind it.
+
+This module deliberately has no Flask or database imports so that the bulk
+pre-render and ticket commands can run it in worker processes.
+"""
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+QR_BOX_SIZE = 10
+QR_BORDER = 5
+
+# Printable tickets are A6 portrait at 300 dpi
+TICKET_DPI = 300
+TICKET_PAGE_SIZE = (1240, 1748)
+TICKET_ACCENT = (102, 126, 234)
+# Stand-in for the QR image in pre-rendered ticket HTML, swapped for a data
+# URI in the worker process
+TICKET_QR_PLACEHOLDER = 'ticket-qr-placeholder'
+
+
+def qr_cache_key(payload):
+    """Return the content address of the QR PNG for ``payload``."""
+    material = f"qr:{QR_BOX_SIZE}:{QR_BORDER}:{payload}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def qr_cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.png")
+
+
+def render_qr_png(payload):
+    """Render ``payload`` as a QR code and return the PNG bytes."""
+    qr = qrcode.QRCode(version=1, box_size=QR_BOX_SIZE, border=QR_BORDER)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+
+    img_bytes = BytesIO()
+    qr_img.save(img_bytes, format='PNG')
+    return img_bytes.getvalue()
+
+
+def write_cache_file(path, data):
+    """Atomically write ``data`` to ``path``.
+
+    Concurrent writers of the same key produce identical bytes, so whichever
+    rename lands last wins without readers ever seeing a partial file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_cache_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def ensure_qr_cached(cache_dir, payload):
+    """Render ``payload`` into the disk cache unless it is already there.
+
+    Returns the cache key. Used directly by the bulk pre-render command's
+    process pool.
+    """
+    key = qr_cache_key(payload)
+    path = qr_cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        write_cache_file(path, render_qr_png(payload))
+    return key
+
+
+def find_wkhtmltopdf(path=None):
+    """Return the wkhtmltopdf executable to use, or None to draw with Pillow."""
+    if path:
+        return path if os.path.exists(path) else shutil.which(path)
+    return shutil.which('wkhtmltopdf')
+
+
+@lru_cache(maxsize=None)
+def _font(size, bold=False):
+    for name in (('DejaVuSans-Bold.ttf', 'Arial Bold.ttf') if bold else ('DejaVuSans.ttf', 'Arial.ttf')):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _fit(draw, text, font, max_width):
+    """Shorten ``text`` with an ellipsis until it fits ``max_width`` pixels."""
+    text = str(text or '')
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + '\u2026', font=font) > max_width:
+        text = text[:-1]
+    return text + '\u2026'
+
+
+def draw_ticket_pdf(ticket, qr_png):
+    """Lay out a ticket with Pillow and return it as a one-page PDF."""
+    width, height = TICKET_PAGE_SIZE
+    margin = 90
+    page = Image.new('RGB', TICKET_PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+
+    draw.rectangle([0, 0, width, 320], fill=TICKET_ACCENT)
+    draw.text((width // 2, 120), 'Training Event Ticket', font=_font(84, bold=True), fill='white', anchor='mm')
+    draw.text((width // 2, 230), _fit(draw, ticket['program'], _font(56), width - 2 * margin),
+              font=_font(56), fill='white', anchor='mm')
+
+    y = 390
+    for label, value in (('Name', ticket['name']),
+                         ('Email', ticket['email']),
+                         ('Organization', ticket.get('organization')),
+                         ('Location', ticket.get('location')),
+                         ('Registered', ticket.get('date')),
+                         ('Registration ID', ticket['id'])):
+        if not value:
+            continue
+        draw.text((margin, y), label.upper(), font=_font(32), fill=(110, 110, 110))
+        draw.text((margin, y + 40), _fit(draw, value, _font(52, bold=True), width - 2 * margin),
+                  font=_font(52, bold=True), fill=(40, 40, 40))
+        y += 125
+
+    qr_size = min(560, height - y - 190)
+    with Image.open(BytesIO(qr_png)) as qr:
+        qr = qr.convert('RGB').resize((qr_size, qr_size), Image.NEAREST)
+    page.paste(qr, ((width - qr_size) // 2, y + 10))
+    draw.text((width // 2, height - 110), 'Please present this QR code at the event entrance',
+              font=_font(34), fill=(100, 100, 100), anchor='mm')
+    draw.rectangle([20, 20, width - 21, height - 21], outline=TICKET_ACCENT, width=6)
+
+    buffer = BytesIO()
+    page.save(buffer, format='PDF', resolution=TICKET_DPI)
+    return buffer.getvalue()
+
+
+def html_to_pdf(html, wkhtmltopdf):
+    import pdfkit
+
+    configuration = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf)
+    return pdfkit.from_string(html, False, configuration=configuration,
+                              options={'page-size': 'A6', 'quiet': '', 'encoding': 'UTF-8'})
+
+
+def render_ticket_pdf(cache_dir, wkhtmltopdf, ticket):
+    """Render one printable ticket and return ``(ticket_id, pdf_bytes)``.
+
+    ``ticket`` is a plain dict (it crosses process boundaries). When it
+    carries pre-rendered ``html`` and wkhtmltopdf is available the HTML
+    ticket is printed; otherwise the ticket is drawn with Pillow, which needs
+    nothing outside Python. The QR comes from the shared disk cache.
+    """
+    key = ensure_qr_cached(cache_dir, ticket['payload'])
+    qr_png = read_cache_file(qr_cache_path(cache_dir, key))
+    if wkhtmltopdf and ticket.get('html'):
+        try:
+            data_uri = 'data:image/png;base64,' + base64.b64encode(qr_png).decode('ascii')
+            return ticket['id'], html_to_pdf(ticket['html'].replace(TICKET_QR_PLACEHOLDER, data_uri), wkhtmltopdf)
+        except (ImportError, OSError):
+            pass  # pdfkit missing or wkhtmltopdf failed: draw it instead
+    return ticket['id'], draw_ticket_pdf(ticket, qr_png)